@@ -1,63 +1,235 @@
 # app/changelog_parser.py
+import io
 import re
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 from app.logger import global_logger
 
+# Préfixe littéral commun à tous les en-têtes de section.
+_HEADER_PREFIX = "***** ChangeLog for "
+
+# Pattern unique des en-têtes de section : détecte N'IMPORTE QUELLE section et capture sa version,
+# comparée ensuite au préfixe recherché (voir _is_target_version).
+_HEADER_RE = re.compile(r"^\*{5} ChangeLog for (?P<ver>.*?) compared to .* \*{5}$")
+
+# Un préfixe de version ne contient que des chiffres et des points (ex: "22", "22.0").
+_SAFE_PREFIX_RE = re.compile(r"\A[\d.]+\Z")
+
+# Pattern d'un numéro de PR dans une ligne de changelog (ex: #12345 ou .../pull/12345).
+_PR_NUMBER_RE = re.compile(r"(?:#|/pull/)(\d+)")
+
+# Préambule de la rubrique "Warning:", ignoré par iter_classified_lines.
+_WARNING_PREAMBLE_LINE = ("the following changes may create regressions for some external modules, "
+                          "but were necessary to make dolibarr better:")
+
+# Lignes de contrôle d'une section (comparées en minuscules) -> (action, type de ligne).
+# "warning:" assigne aussi le type 'dev'.
+_CONTROL_LINES = {
+    "for users:": ("set_type", "user"),
+    "for developers:": ("set_type", "dev"),
+    "warning:": ("set_type", "dev"),
+    _WARNING_PREAMBLE_LINE: ("skip", None),
+}
+
+# Classification d'une ligne de section (insensible à la casse, espaces de début et de fin exclus) :
+# séparateur de tirets, ligne de contrôle (_CONTROL_LINES), en-tête de section, ou contenu à insérer.
+_CLASSIFY_RE = re.compile(
+    r"^[^\S\n]*(?:"
+    r"(?P<sep>-+)"
+    r"|(?P<control>" + "|".join(re.escape(control_line) for control_line in _CONTROL_LINES) + r")"
+    r"|(?P<header>\*{5} changelog for .*\*{5})"
+    r"|(?P<content>\S.*?)"
+    r")[^\S\n]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def _is_target_version(version: str, version_prefix_input: str) -> bool:
+    """
+    Indique si la version d'un en-tête correspond au préfixe recherché :
+    "<préfixe>.0.0" éventuellement suivi de chiffres et de points (ex: "22" -> "22.0.0", "22.0.0.1").
+    """
+    target = version_prefix_input + ".0.0"
+    return version.startswith(target) and not version[len(target):].strip(".0123456789")
+
+
 class ChangelogParser:
     """
     Analyse le contenu d'un changelog pour en extraire des sections spécifiques.
     """
 
-    def extract_version_section(self, changelog_content: str, version_prefix_input: str) -> List[str]:
+    @staticmethod
+    def is_valid_version_prefix(version_prefix_input: str) -> bool:
+        """
+        Indique si un préfixe de version est accepté par extract_version_section
+        (chiffres et points uniquement, ex: "22", "22.0").
+        """
+        return bool(_SAFE_PREFIX_RE.match(version_prefix_input))
+
+    def extract_version_section(self, changelog_content: Union[str, Iterable[str]], version_prefix_input: str) -> List[str]:
         """
         Extrait une section spécifique du changelog basée sur un préfixe/numéro de version.
         Le format attendu est: "***** ChangeLog for <version> compared to ... *****"
 
         Args:
-            changelog_content (str): Contenu complet du changelog.
+            changelog_content (Union[str, Iterable[str]]): Contenu complet du changelog, ou ses lignes
+                (ex: lues en flux) : la lecture s'arrête alors dès la fin de la section.
             version_prefix_input (str): Version à rechercher (ex: "22.0.0", "22.0", "22").
 
         Returns:
             List[str]: Une liste de lignes pour la section trouvée, ou une liste vide si non trouvée.
+
+        Raises:
+            ValueError: Si le préfixe de version contient autre chose que des chiffres et des points.
         """
-        section_lines: List[str] = []
-        in_section = False
+        return self.extract_version_section_text(changelog_content, version_prefix_input).splitlines()
+
+    def extract_version_section_text(self, changelog_content: Union[str, Iterable[str]],
+                                     version_prefix_input: str) -> str:
+        """
+        Extrait le texte brut d'une section (en-tête inclus), sans le découper en lignes.
+
+        Args:
+            changelog_content (Union[str, Iterable[str]]): Contenu complet du changelog, ou ses lignes
+                (sans saut de ligne final) ; celles-ci ne sont consommées que jusqu'à la fin de la section.
+            version_prefix_input (str): Version à rechercher (ex: "22.0.0", "22.0", "22").
+
+        Returns:
+            str: Le texte de la section trouvée, ou une chaîne vide si non trouvée.
+
+        Raises:
+            ValueError: Si le préfixe de version contient autre chose que des chiffres et des points.
+        """
+        if not self.is_valid_version_prefix(version_prefix_input):
+            raise ValueError(f"Préfixe de version invalide : '{version_prefix_input}' (chiffres et points uniquement).")
 
-        # Pattern pour trouver la ligne d'en-tête de la section pour la version souhaitée.
-        section_header_pattern_str = (
-            f"^\\*\\*\\*\\*\\* ChangeLog for {re.escape(version_prefix_input)}.0.0(?:[.\\d]*)?"
-            f" compared to .* \\*\\*\\*\\*\\*$"
-        )
-        section_header_pattern = re.compile(section_header_pattern_str)
+        global_logger.info("ℹ️  Recherche de la section pour la version commençant par '%s'...", version_prefix_input)
+        global_logger.debug("   (Pattern utilisé: %s, version attendue: %s.0.0*)", _HEADER_RE.pattern, version_prefix_input)
 
-        # Pattern pour détecter le début de N'IMPORTE QUELLE section de changelog.
-        any_changelog_header_pattern = re.compile(r"^\*\*\*\*\* ChangeLog for .* compared to .* \*\*\*\*\*$")
+        if isinstance(changelog_content, str):
+            section_text = self._find_version_section(changelog_content, version_prefix_input)
+            if section_text is None:
+                # Le chemin rapide n'a pas pu valider les en-têtes : on retombe sur l'analyse ligne à ligne.
+                global_logger.debug("   (Recherche rapide infructueuse, analyse ligne par ligne...)")
+                # newline=None active les sauts de ligne universels (\n, \r\n, \r), comme splitlines().
+                section_lines = self._scan_version_section(
+                    (raw_line.rstrip("\n") for raw_line in io.StringIO(changelog_content, newline=None)),
+                    version_prefix_input)
+                section_text = "".join(f"{line}\n" for line in section_lines)
+        else:
+            section_text = "".join(f"{line}\n" for line in self._scan_version_section(changelog_content,
+                                                                                      version_prefix_input))
 
-        global_logger.info(f"ℹ️  Recherche de la section pour la version commençant par '{version_prefix_input}'...")
-        global_logger.debug(f"   (Pattern utilisé: {section_header_pattern_str})")
+        if not section_text:
+            global_logger.warning("⚠️ Aucune section trouvée pour la version '%s' ou commençant par celle-ci.", version_prefix_input)
+
+        return section_text
+
+    def _find_version_section(self, changelog_content: str, version_prefix_input: str) -> Optional[str]:
+        """
+        Localise la section via des recherches littérales (str.find) plutôt qu'un regex par ligne.
+        Les en-têtes candidats sont ensuite validés par le pattern compilé.
+
+        Returns:
+            Optional[str]: Le texte de la section, ou None si l'en-tête n'a pas pu être validé.
+        """
+        needle = _HEADER_PREFIX + version_prefix_input
+        if changelog_content.startswith(needle):
+            start = 0
+        else:
+            start = changelog_content.find("\n" + needle)
+            if start == -1:
+                return None
+            start += 1
+
+        header_line = self._line_at(changelog_content, start)
+        header_match = _HEADER_RE.match(header_line)
+        if not header_match or not _is_target_version(header_match.group('ver'), version_prefix_input):
+            return None
+        global_logger.info("✅ Section trouvée, commençant par : %s", header_line)
+
+        # Recherche de l'en-tête de la section suivante (le premier qui est un en-tête valide).
+        end = changelog_content.find("\n" + _HEADER_PREFIX, start)
+        while end != -1:
+            next_header_line = self._line_at(changelog_content, end + 1)
+            if _HEADER_RE.match(next_header_line):
+                global_logger.info("ℹ️  Fin de la section détectée à la ligne : %s", next_header_line)
+                # Conserver le saut de ligne final pour garder une éventuelle ligne vide de fin de section.
+                return changelog_content[start:end + 1]
+            end = changelog_content.find("\n" + _HEADER_PREFIX, end + 1)
+
+        return changelog_content[start:]
+
+    @staticmethod
+    def _line_at(content: str, start: int) -> str:
+        """
+        Retourne la ligne commençant à l'index donné (sans le saut de ligne final).
+        """
+        line_end = content.find("\n", start)
+        if line_end == -1:
+            line_end = len(content)
+        return content[start:line_end].rstrip("\r")
+
+    def _scan_version_section(self, lines: Iterable[str], version_prefix_input: str) -> List[str]:
+        """
+        Analyse ligne par ligne du changelog : chemin des lectures en flux, et secours du chemin rapide.
+        Les lignes sont consommées paresseusement et la lecture s'arrête à la fin de la section.
+        """
+        section_lines: List[str] = []
+        in_section = False
 
-        lines = changelog_content.splitlines()
         for line in lines:
+            # Comparaison littérale d'abord : le regex (qui reconnaît tout en-tête et capture sa version)
+            # n'est évalué que pour les lignes qui commencent comme un en-tête.
+            header_match = _HEADER_RE.match(line) if line.startswith(_HEADER_PREFIX) else None
             if not in_section:
-                if section_header_pattern.match(line):
+                if header_match and _is_target_version(header_match.group('ver'), version_prefix_input):
                     in_section = True
                     section_lines.append(line)  # Inclure la ligne d'en-tête
-                    global_logger.info(f"✅ Section trouvée, commençant par : {line}")
+                    global_logger.info("✅ Section trouvée, commençant par : %s", line)
             else:
                 # Si nous sommes dans une section, vérifier si la ligne actuelle est l'en-tête d'une *autre* section.
-                if any_changelog_header_pattern.match(line):
-                    global_logger.info(f"ℹ️  Fin de la section détectée à la ligne : {line}")
+                if header_match:
+                    global_logger.info("ℹ️  Fin de la section détectée à la ligne : %s", line)
                     break
                 section_lines.append(line)
 
-        if not section_lines:
-            global_logger.warning(f"⚠️ Aucune section trouvée pour la version '{version_prefix_input}' ou commençant par celle-ci.")
-
         return section_lines
 
+    def iter_classified_lines(self, section_text: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Parcourt une section et produit, au fil de l'eau, les lignes de contenu avec leur type,
+        prêtes à être insérées (voir DbHandler.insert_changelog_lines_bulk) sans liste intermédiaire.
+
+        Une seule passe regex sur toute la section : chaque ligne non vide est étiquetée
+        (séparateur, ligne de contrôle, en-tête ou contenu) et déjà nettoyée de ses espaces.
+
+        Args:
+            section_text (str): Texte brut de la section (voir extract_version_section_text).
+
+        Yields:
+            Tuple[str, Optional[str]]: (line_content, line_type), le type valant 'user', 'dev' ou None.
+        """
+        current_db_line_type = None
+        for line_match in _CLASSIFY_RE.finditer(section_text):
+            line_kind = line_match.lastgroup
+
+            if line_kind == "content":
+                yield line_match.group("content"), current_db_line_type  # Ligne nettoyée
+            elif line_kind == "control":
+                control_line = line_match.group("control")
+                action, line_type = _CONTROL_LINES[control_line.lower()]
+                if action == "set_type":
+                    current_db_line_type = line_type
+                    global_logger.info(" Contexte changé à : %s (section: %s)", current_db_line_type, control_line.lower())
+                else:  # "skip"
+                    global_logger.debug("  Ligne de préambule Warning ignorée : %s...", control_line[:60])
+            elif line_kind == "header":
+                current_db_line_type = None
+            # "sep" : ligne de séparation composée uniquement de tirets, ignorée
+
     def extract_pr_number_from_text(self, text: str) -> Optional[int]:
         """
-        Extrait le premier numéro de PR (ex: #12345) d'une chaîne de caractères.
+        Extrait le premier numéro de PR (ex: #12345, ou un lien .../pull/12345) d'une chaîne de caractères.
 
         Args:
             text (str): La chaîne de caractères à analyser.
@@ -65,9 +237,10 @@ class ChangelogParser:
         Returns:
             Optional[int]: Le numéro de la PR sous forme d'entier si trouvé, sinon None.
         """
-        if not text:
+        # La plupart des lignes ne contiennent aucune référence : inutile de lancer le moteur regex.
+        if not text or ('#' not in text and '/pull/' not in text):
             return None
-        match = re.search(r"#(\d+)", text)
+        match = _PR_NUMBER_RE.search(text)
         return int(match.group(1)) if match else None
 
     # TODO Refacto https://gemini.google.com/gem/coding-partner/aa5af5f2633f3ea4
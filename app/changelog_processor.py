@@ -1,13 +1,23 @@
 # app/changelog_processor.py
-import re
-from app.github import GitHubService
-from app.db_handler import DbHandler
+import hashlib
+import io
+import json
+import os
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+from app.github import GitHubService, NOT_FOUND
+from app.db_handler import ChangelogRow, DbHandler
 from app.changelog_parser import ChangelogParser
 from app.logger import global_logger
+from app.llm_cache import LLMCachedClient
+from app.lru_cache import LRUCache
+from app.rate_limiter import LLMRateLimiter
 from flask_service_tools import AIGatewayClient, Config
 from app.changelog_writer import ChangelogWriter
 
-
 class ChangelogProcessor:
     """
     Orchestre l'enrichissement des données du changelog
@@ -16,9 +26,18 @@ class ChangelogProcessor:
     # Constantes pour la configuration et les messages
     LLM_MODEL_NAME = 'chat-gpt4o-mini'
     MAX_DIFF_LENGTH = 3500
+    MAX_PROMPT_TOKENS = 4000  # Budget estimé (~4 caractères par token) d'un prompt unitaire
+    UPDATE_BATCH_SIZE = 32  # Mises à jour de lignes regroupées dans une même transaction
+    MAX_WORKERS = 8  # Lignes traitées en parallèle (appels réseau GitHub / IA)
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))  # Appels simultanés à l'IA (quota du fournisseur)
+    LLM_RPM = int(os.getenv("LLM_RPM", "0"))  # Requêtes par minute vers l'IA (0 : pas de limite)
+    LLM_TPM = int(os.getenv("LLM_TPM", "0"))  # Tokens (estimés) par minute vers l'IA (0 : pas de limite)
+    LLM_BATCH_SIZE = 5  # Lignes de même type résumées par un seul appel à l'IA
+    GITHUB_CACHE_SIZE = 1000  # Entrées conservées par cache d'appels GitHub (détails, diffs, recherches)
     INSUFFICIENT_INFO_MSG = "Information insuffisante pour résumer."
     NO_DESCRIPTION_MSG = "Aucune description fournie."
     MSG_EMPTY_CONTENT = "Contenu de ligne vide (None)"
+    MSG_NON_INDEXABLE_LINE = "Ligne non-indexable"
     DEFAULT_PR_IDENTIFICATION_FAILURE_REASON = "Raison inconnue d'échec d'identification PR"
     LOG_SEPARATOR = "\n\n========== CHANGELOG ENTRY ==========\n\n"
 
@@ -35,33 +54,82 @@ class ChangelogProcessor:
         "la nature du changement (ex: refactoring, ajout de hook, modification d'API, optimisation de requête) et son impact technique principal (ex: modules/classes clés affectés, conséquences sur les performances, changements de dépendances, dépréciation de fonctionnalités) pour un autre développeur. "
         f"Si l'ensemble de ces informations n'est pas suffisant pour un résumé pertinent, indique '{INSUFFICIENT_INFO_MSG}'."
     )
+    # Instruction de résumé et audience cible par type de ligne ('user' par défaut).
+    _AUDIENCE = {
+        'dev': (DEV_SUMMARY_INSTRUCTION, "un développeur"),
+        'user': (USER_SUMMARY_INSTRUCTION, "un utilisateur final de Dolibarr"),
+    }
+    # Gabarit du prompt unitaire (syntaxe string.Template : le diff inséré n'est jamais réinterprété).
     LLM_CONTEXT_PROMPT_TEMPLATE = """Contexte : Tu es un assistant IA chargé de rédiger des notes de version claires et concises pour le logiciel Dolibarr, en adaptant le message à l'audience cible.
 
     Informations disponibles pour générer le résumé :
 
-    1.  **Ligne originale du changelog :** "{line_content}"
+    1.  **Ligne originale du changelog :** "$line_content"
 
-    2.  **Informations techniques de la Pull Request (PR) #{pr_number} associée :**
-        * Titre de la PR : {pr_title}
+    2.  **Informations techniques de la Pull Request (PR) #${pr_number} associée :**
+        * Titre de la PR : $pr_title
         * Description de la PR :
-            {pr_description}
+            $pr_description
 
     3.  **Diff des modifications (extrait potentiellement tronqué) :**
         ```diff
-    {pr_diff_content}
+    $pr_diff_content
         ```
-        (Note: Le diff ci-dessus peut être tronqué à {max_diff_length} caractères.)
+        (Note: Le diff ci-dessus peut être tronqué à $max_diff_length caractères.)
 
-    Ta tâche est de générer un résumé pour {audience_target}.
+    Ta tâche est de générer un résumé pour $audience_target.
 
     Instruction spécifique pour le résumé :
-    {summary_instruction}
+    $summary_instruction
 
     Règles importantes pour le résumé :
     - Ne mentionne PAS le numéro de la PR.
     - Commence directement par le résumé.
-    - Si tu estimes que l'information est insuffisante, réponds UNIQUEMENT par la phrase '{insufficient_info_msg}'.
+    - Si tu estimes que l'information est insuffisante, réponds UNIQUEMENT par la phrase '$insufficient_info_msg'.
+    """
+    # Prompts unitaires précompilés par audience : l'instruction et l'audience y sont déjà intégrées,
+    # seuls les champs propres à la ligne restent à substituer lors de chaque appel.
+    _USER_PROMPT = string.Template(string.Template(LLM_CONTEXT_PROMPT_TEMPLATE).safe_substitute(
+        audience_target=_AUDIENCE['user'][1],
+        summary_instruction=_AUDIENCE['user'][0],
+        insufficient_info_msg=INSUFFICIENT_INFO_MSG,
+    ))
+    _DEV_PROMPT = string.Template(string.Template(LLM_CONTEXT_PROMPT_TEMPLATE).safe_substitute(
+        audience_target=_AUDIENCE['dev'][1],
+        summary_instruction=_AUDIENCE['dev'][0],
+        insufficient_info_msg=INSUFFICIENT_INFO_MSG,
+    ))
+
+    LLM_BATCH_PROMPT_TEMPLATE = """Contexte : Tu es un assistant IA chargé de rédiger des notes de version claires et concises pour le logiciel Dolibarr, en adaptant le message à l'audience cible.
+
+    Ta tâche est de générer un résumé pour {audience_target} pour CHACUNE des {entry_count} entrées numérotées ci-dessous.
+
+    Instruction spécifique pour chaque résumé :
+    {summary_instruction}
+
+    Règles importantes pour les résumés :
+    - Ne mentionne PAS les numéros de PR.
+    - Chaque résumé commence directement par son contenu.
+    - Si tu estimes que l'information d'une entrée est insuffisante, son résumé est UNIQUEMENT la phrase '{insufficient_info_msg}'.
+    - Réponds UNIQUEMENT par un tableau JSON de {entry_count} chaînes de caractères, dans l'ordre des entrées (ex: ["résumé de l'entrée 1", "résumé de l'entrée 2"]), sans aucun texte autour.
+    {entries}
     """
+    # Gabarit d'une entrée de prompt groupé, précompilé (syntaxe string.Template).
+    LLM_BATCH_ENTRY_TEMPLATE = string.Template("""
+    ### Entrée $entry_index
+
+    1.  **Ligne originale du changelog :** "$line_content"
+
+    2.  **Informations techniques de la Pull Request (PR) #${pr_number} associée :**
+        * Titre de la PR : $pr_title
+        * Description de la PR :
+            $pr_description
+
+    3.  **Diff des modifications (extrait potentiellement tronqué à $max_diff_length caractères) :**
+        ```diff
+    $pr_diff_content
+        ```
+    """)
 
     THEMATIC_SUMMARY_PROMPT_TEMPLATE = """
     Contexte : Tu es un assistant IA expert en rédaction technique, chargé de finaliser les notes de version du logiciel ERP/CRM Dolibarr.
@@ -103,12 +171,31 @@ class ChangelogProcessor:
         self.github_service = github_service
         self.ai_client = ai_client
         self.parser = parser
+        # Mémorisation des appels GitHub pendant la durée de vie du processor :
+        # une même PR (ou une même recherche) n'est demandée qu'une fois.
+        self._pr_details_cache = LRUCache(self.GITHUB_CACHE_SIZE)  # numéro -> (détails, lien)
+        self._pr_diff_cache = LRUCache(self.GITHUB_CACHE_SIZE)  # numéro -> extrait du diff
+        self._pr_search_cache = LRUCache(self.GITHUB_CACHE_SIZE)  # terme -> PRs trouvées
+        # Pool dédié au préchargement des diffs : distinct du pool de traitement des lignes,
+        # dont les threads attendent ces préchargements. Il n'existe que le temps de
+        # process_changelog_lines_refactored (None en dehors : pas de préchargement).
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+        # Les appels à l'IA sont bornés indépendamment du pool : les préparations GitHub
+        # continuent pendant que les résumés attendent un créneau.
+        self._llm_semaphore = threading.BoundedSemaphore(self.LLM_CONCURRENCY)
+        self._llm_rate_limiter = LLMRateLimiter(self.LLM_RPM, self.LLM_TPM)
+        # Étapes disponibles (une sous-classe peut les retirer), vérifiées une fois pour toutes.
+        self.has_determine_line_type = callable(getattr(self, 'determine_line_type_and_process_db', None))
+        self.has_summarize_by_theme = callable(getattr(self, 'summarize_by_theme', None))
         global_logger.info("  [Processor] Initialisé.")
 
     def _prepare_data_for_llm_and_db(self, line_content: str, pr_info: dict, pr_diff_content: str,
-                                     changelog_line_type: str = 'user'):
+                                     changelog_line_type: Optional[str] = 'user'):
         """
-        Prépare les données pour la DB (partie liée à la PR) et le prompt LLM.
+        Prépare les données pour la DB (partie liée à la PR) et les champs du prompt LLM.
+        L'extrait de diff est réduit si le prompt unitaire dépasse MAX_PROMPT_TOKENS (estimation) ;
+        l'estimation finale est conservée dans 'estimated_prompt_tokens'. Elle peut encore dépasser
+        le budget si le titre et la description suffisent à l'excéder : la ligne est alors écartée.
         """
         pr_details = pr_info.get('pr_details', {})
         pr_number = pr_info.get('pr_number')
@@ -119,69 +206,155 @@ class ChangelogProcessor:
         if not pr_description:  # Assurer que ce n'est jamais None ou vide pour le template
             pr_description = self.NO_DESCRIPTION_MSG
 
+        # Seul l'extrait transmis à l'IA est conservé, en base comme dans le prompt.
+        diff_for_prompt = pr_diff_content[:self.MAX_DIFF_LENGTH]
+
         # Données liées à la PR pour la base de données
         llm_related_db_data = {
-            'pr_desc': f"Titre PR: {pr_title}\n\nDescription PR:\n{pr_description}",
+            'pr_title': pr_title,
+            'pr_body': pr_description,
             'link': pr_link,
-            'diff': pr_diff_content,
+            'diff': diff_for_prompt,
         }
 
-        if changelog_line_type == 'dev':
-            summary_instruction = self.DEV_SUMMARY_INSTRUCTION
-            audience_target = "un développeur"
-        else:  # 'user' ou autre
-            summary_instruction = self.USER_SUMMARY_INSTRUCTION
-            audience_target = "un utilisateur final de Dolibarr"
-
-        llm_prompt = self.LLM_CONTEXT_PROMPT_TEMPLATE.format(
-            line_content=line_content,
-            pr_number=pr_number,
-            pr_title=pr_title,
-            pr_description=pr_description,
-            pr_diff_content=pr_diff_content[:self.MAX_DIFF_LENGTH],
-            max_diff_length=self.MAX_DIFF_LENGTH,
+        # Champs communs au prompt unitaire et aux entrées d'un prompt groupé
+        prompt_fields = {
+            'line_content': line_content,
+            'pr_number': pr_number,
+            'pr_title': pr_title,
+            'pr_description': pr_description,
+            'pr_diff_content': diff_for_prompt,
+            'max_diff_length': self.MAX_DIFF_LENGTH,
+        }
+
+        # Le diff est réduit de moitié tant que le prompt estimé dépasse le budget de tokens.
+        prompt_template = self._prompt_template_for(changelog_line_type)
+        n_tokens = LLMRateLimiter.estimate_tokens(prompt_template.substitute(prompt_fields))
+        while diff_for_prompt and n_tokens > self.MAX_PROMPT_TOKENS:
+            diff_for_prompt = diff_for_prompt[:len(diff_for_prompt) // 2]
+            prompt_fields['pr_diff_content'] = diff_for_prompt
+            llm_related_db_data['diff'] = diff_for_prompt
+            n_tokens = LLMRateLimiter.estimate_tokens(prompt_template.substitute(prompt_fields))
+            global_logger.debug("  LLM ✂️ Prompt trop long, diff réduit à %d caractères.", len(diff_for_prompt))
+        llm_related_db_data['estimated_prompt_tokens'] = n_tokens
+        return llm_related_db_data, prompt_fields
+
+    def _get_summary_instruction(self, changelog_line_type: str):
+        """
+        Retourne l'instruction de résumé et l'audience cible pour un type de ligne.
+        """
+        # 'user' ou autre
+        return self._AUDIENCE.get(changelog_line_type, self._AUDIENCE['user'])
+
+    def _prompt_template_for(self, changelog_line_type: Optional[str]) -> string.Template:
+        """
+        Retourne le prompt unitaire précompilé correspondant au type de ligne ('user' par défaut).
+        """
+        return self._DEV_PROMPT if changelog_line_type == 'dev' else self._USER_PROMPT
+
+    def _build_llm_prompt(self, prompt_fields: dict, changelog_line_type: str = 'user') -> str:
+        """
+        Construit le prompt LLM pour une seule ligne de changelog.
+        """
+        llm_prompt = self._prompt_template_for(changelog_line_type).substitute(prompt_fields)
+
+        global_logger.debug("  LLM 🤖 Prompt pour LLM (type: %s, basé sur line_content+PR) préparé.",
+                            changelog_line_type)
+        return llm_prompt
+
+    def _build_llm_batch_prompt(self, jobs: List[dict]) -> str:
+        """
+        Construit un prompt LLM unique demandant un résumé pour chacune des lignes du lot.
+        Toutes les lignes d'un lot ont le même type (même instruction et même audience).
+        """
+        changelog_line_type = jobs[0]['changelog_type']
+        summary_instruction, audience_target = self._get_summary_instruction(changelog_line_type)
+        entries = "".join(
+            self.LLM_BATCH_ENTRY_TEMPLATE.substitute(job['prompt_fields'], entry_index=index)
+            for index, job in enumerate(jobs, start=1)
+        )
+        llm_prompt = self.LLM_BATCH_PROMPT_TEMPLATE.format(
+            entry_count=len(jobs),
+            entries=entries,
             audience_target=audience_target,
             summary_instruction=summary_instruction,
             insufficient_info_msg=self.INSUFFICIENT_INFO_MSG
         )
 
-        global_logger.info(
-            f"  LLM 🤖 Prompt pour LLM (type: {changelog_line_type}, basé sur line_content+PR) préparé (longueur approx: {len(llm_prompt)}).")
-        return llm_related_db_data, llm_prompt
+        global_logger.debug("  LLM 🤖 Prompt groupé pour %d lignes (type: %s) préparé.",
+                            len(jobs), changelog_line_type)
+        return llm_prompt
 
-    def _process_single_changelog_line(self, line_row: dict) -> str:
+    @staticmethod
+    def _parse_batch_summaries(response_text: str, expected_count: int) -> Optional[List[str]]:
         """
-        Traite une seule ligne de changelog : identification PR, récupération diff,
-        génération de résumé via LLM, et mise à jour en base.
-        Retourne une chaîne résumant l'opération pour l'agrégation des logs.
+        Extrait le tableau JSON de résumés d'une réponse groupée.
+        Retourne None si la réponse est inexploitable (le lot sera alors traité ligne par ligne).
         """
-        line_id = line_row['id']
-        line_content = line_row['line_content']
-        changelog_type = line_row['type']
+        if not response_text:
+            return None
+        start = response_text.find('[')
+        end = response_text.rfind(']')
+        if start == -1 or end < start:
+            return None
+        try:
+            summaries = json.loads(response_text[start:end + 1])
+        except ValueError:
+            return None
+        if (not isinstance(summaries, list) or len(summaries) != expected_count
+                or not all(isinstance(summary, str) for summary in summaries)):
+            return None
+        return [summary.strip() for summary in summaries]
+
+    def _prepare_single_changelog_line(self, line_row: ChangelogRow) -> Dict[str, Any]:
+        """
+        Prépare une seule ligne de changelog : identification PR et récupération du diff.
+        Ne touche pas à la base de données (peut être exécutée dans un thread du pool).
+
+        Retourne un dictionnaire de travail contenant le payload de mise à jour de la base.
+        Si la ligne ne peut pas être résumée, 'log_entry' est renseigné et 'prompt_fields' vaut None ;
+        sinon 'prompt_fields' contient les données du prompt et la ligne attend son résumé IA.
+        """
+        line_id = line_row.id
+        line_content = line_row.line_content
+        changelog_type = line_row.type
 
         # Payload initial pour la mise à jour de la base de données
         db_update_payload = {
             'is_done': False,
             'not_supported': False,
             'not_supported_reason': None,
-            'pr_desc': None,
+            'pr_title': None,
+            'pr_body': None,
             'link': None,
             'diff': None,
-            'desc_and_diff_tokens': None
+            'desc_and_diff_tokens': None,
+            'estimated_prompt_tokens': None,
         }
 
         log_message_prefix = f"{changelog_type} Ligne ID {line_id} ('{line_content}'): \n\n"
+        job = {
+            'line_id': line_id,
+            'changelog_type': changelog_type,
+            'log_message_prefix': log_message_prefix,
+            'db_update_payload': db_update_payload,
+            'prompt_fields': None,
+            'cache_key': None,
+            'summary_to_cache': None,
+            'log_entry': None,
+            'rate_limited': False,
+        }
 
         if line_content is None:
-            global_logger.info(f"  ⚠️ {log_message_prefix} Contenu vide (None), ignorée.")
+            global_logger.info("  ⚠️ %s Contenu vide (None), ignorée.", log_message_prefix)
             db_update_payload.update({
                 'not_supported': True,
                 'not_supported_reason': self.MSG_EMPTY_CONTENT
             })
-            self.db_handler.update_changelog_line(line_id, db_update_payload)
-            return f"{log_message_prefix} Contenu vide, ignorée."
+            job['log_entry'] = f"{log_message_prefix} Contenu vide, ignorée."
+            return job
 
-        global_logger.info(f"\n🔎 Traitement de la {log_message_prefix}")
+        global_logger.debug("\n🔎 Traitement de la %s", log_message_prefix)
 
         pr_identification_result = self._attempt_pr_identification(line_content)
 
@@ -189,123 +362,354 @@ class ChangelogProcessor:
             pr_info = pr_identification_result
             pr_number_identified = pr_info['pr_number']
 
-            global_logger.info(f"   PR #{pr_number_identified} IDENTIFIÉE ({pr_info.get('method', 'N/A')}). DIFF 🔄 Récupération...")
-            pr_diff_content = self.github_service.get_pr_diff(pr_number_identified)
+            global_logger.debug("   PR #%s IDENTIFIÉE (%s). DIFF 🔄 Récupération...",
+                                pr_number_identified, pr_info.get('method', 'N/A'))
+            # Seuls MAX_DIFF_LENGTH caractères sont utilisés : inutile de télécharger le diff complet.
+            pr_diff_content = self.get_pr_diff_excerpt(pr_number_identified)
 
             if pr_diff_content:
-                global_logger.info(f"  DIFF ✅ Diff récupéré (longueur: {len(pr_diff_content)} caractères).")
+                global_logger.debug("  DIFF ✅ Diff récupéré (longueur: %d caractères).", len(pr_diff_content))
 
-                llm_db_data, generated_llm_prompt = self._prepare_data_for_llm_and_db(
+                llm_db_data, prompt_fields = self._prepare_data_for_llm_and_db(
                     line_content, pr_info, pr_diff_content, changelog_type
                 )
                 db_update_payload.update(llm_db_data)
-
-                global_logger.info("  LLM 🤖 Requête envoyée à l'IA...")
-                try:
-                    response = self.ai_client.chat_predict(
-                        self.LLM_MODEL_NAME,
-                        messages=[{"role": "user", "content": generated_llm_prompt}]
-                    )
-                    global_logger.info(
-                        f"  LLM ✅ Réponse reçue - Modèle: {response.get('model', 'N/A')}, Tokens prompt: {response.get('prompt_tokens', 'N/A')}, Tokens complétion: {response.get('completion_tokens', 'N/A')}, Temps: {response.get('response_time_ms', 'N/A')}ms")
-
-                    summary_result = response.get("response", "")
-                    prompt_tokens = response.get("prompt_tokens", 0)
-                    completion_tokens = response.get("completion_tokens", 0)
-
-                    db_update_payload.update({
-                        'is_done': True,
-                        'desc_and_diff_tokens': prompt_tokens + completion_tokens
-                    })
-                    # Mettre 'summary' dans db_update_payload si la BDD a un champ pour ça
-                    # db_update_payload['generated_summary'] = summary_result
-                    log_entry = f"{log_message_prefix} Résumé généré: {summary_result}"
-
-                except Exception as e:
-                    error_msg = f"Erreur lors de l'appel à l'IA: {str(e)}"
-                    global_logger.error(f"  LLM ❌ {error_msg}")
+                if llm_db_data['estimated_prompt_tokens'] > self.MAX_PROMPT_TOKENS:
+                    # Même sans diff, le titre et la description de la PR dépassent le budget.
+                    reason = (f"Prompt trop long pour PR #{pr_number_identified} "
+                              f"(~{llm_db_data['estimated_prompt_tokens']} tokens estimés, "
+                              f"budget {self.MAX_PROMPT_TOKENS})")
+                    global_logger.error("  LLM ❌ %s.", reason)
                     db_update_payload.update({
                         'not_supported': True,
-                        'not_supported_reason': error_msg
+                        'not_supported_reason': reason
                     })
-                    log_entry = f"{log_message_prefix} Échec de génération de résumé ({error_msg})."
+                    job['log_entry'] = f"{log_message_prefix} {reason}, pas de résumé généré."
+                    return job
+                job['prompt_fields'] = prompt_fields
+                job['cache_key'] = self._summary_cache_key(
+                    line_content, changelog_type, pr_number_identified, pr_diff_content
+                )
             else:
                 reason = f'Diff non récupérable pour PR #{pr_number_identified}'
-                global_logger.error(f"  DIFF ❌ {reason}.")
+                global_logger.error("  DIFF ❌ %s.", reason)
                 db_update_payload.update({
                     'not_supported': True,
                     'not_supported_reason': reason,
                     'link': pr_info.get('pr_link')  # On a quand même le lien de la PR
                 })
-                log_entry = f"{log_message_prefix} Pas de Diff trouvé, pas de résumé généré."
+                job['log_entry'] = f"{log_message_prefix} Pas de Diff trouvé, pas de résumé généré."
         else:
             reason = pr_identification_result.get('reason', self.DEFAULT_PR_IDENTIFICATION_FAILURE_REASON)
-            global_logger.error(f"  PR IDENTIFICATION ❌ {reason}")
+            global_logger.error("  PR IDENTIFICATION ❌ %s", reason)
             db_update_payload.update({
                 'not_supported': True,
                 'not_supported_reason': reason
             })
-            log_entry = f"{log_message_prefix} Pas de PR trouvée ({reason}), pas de résumé généré."
+            job['log_entry'] = f"{log_message_prefix} Pas de PR trouvée ({reason}), pas de résumé généré."
+
+        return job
+
+    @staticmethod
+    def _summary_cache_key(line_content: str, changelog_type: Optional[str], pr_number: int,
+                           pr_diff_content: str) -> str:
+        """
+        Calcule la clé du cache des résumés : une même ligne, pour une même PR et un même diff,
+        donne le même prompt et n'a pas besoin d'être renvoyée à l'IA.
+        """
+        raw_key = f"{changelog_type}|{line_content}|{pr_number}|{pr_diff_content or ''}"
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def _complete_job(self, job: dict, summary_result: str, total_tokens: int) -> dict:
+        """
+        Renseigne le payload et l'entrée de log d'une ligne dont le résumé a été généré.
+        """
+        if summary_result:
+            job['summary_to_cache'] = {'response': summary_result, 'total_tokens': total_tokens}
+        job['db_update_payload'].update({
+            'is_done': True,
+            'desc_and_diff_tokens': total_tokens
+        })
+        # Mettre 'summary' dans db_update_payload si la BDD a un champ pour ça
+        # db_update_payload['generated_summary'] = summary_result
+        job['log_entry'] = f"{job['log_message_prefix']} Résumé généré: {summary_result}"
+        return job
+
+    def _chat_predict(self, prompt: str, use_llm_cache: bool = True) -> dict:
+        """
+        Envoie un prompt à l'IA en respectant la limite d'appels simultanés (LLM_CONCURRENCY)
+        et les limites de débit du fournisseur (LLM_RPM, LLM_TPM).
+        Avec use_llm_cache faux, un LLMCachedClient est contourné : le résultat est déjà conservé
+        par summary_cache et n'a pas à être stocké une seconde fois dans llm_cache.
+        Sinon, le cache est consulté avant de réserver un créneau : une réponse en cache
+        n'attend pas et ne consomme pas le budget de débit.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        ai_client = self.ai_client
+        if isinstance(ai_client, LLMCachedClient):
+            if not use_llm_cache:
+                ai_client = ai_client.wrapped_client
+            else:
+                cached_response = ai_client.lookup(self.LLM_MODEL_NAME, messages)
+                if cached_response is not None:
+                    return cached_response
+        with self._llm_semaphore:
+            self._llm_rate_limiter.acquire(prompt)
+            return ai_client.chat_predict(self.LLM_MODEL_NAME, messages=messages)
+
+    def _summarize_single_job(self, job: dict) -> dict:
+        """
+        Génère le résumé d'une seule ligne via un appel dédié à l'IA.
+        """
+        generated_llm_prompt = self._build_llm_prompt(job['prompt_fields'], job['changelog_type'])
 
-        self.db_handler.update_changelog_line(line_id, db_update_payload)
-        global_logger.info(f"  💾 Ligne ID {line_id} mise à jour dans la base de données.")
-        return log_entry
+        global_logger.debug("  LLM 🤖 Requête envoyée à l'IA...")
+        try:
+            # Résumé unitaire : conservé par summary_cache (clé de la ligne), pas dans llm_cache.
+            response = self._chat_predict(generated_llm_prompt, use_llm_cache=False)
+            global_logger.info(
+                "  LLM ✅ Réponse reçue - Modèle: %s, Tokens prompt: %s, Tokens complétion: %s, Temps: %sms",
+                response.get('model', 'N/A'), response.get('prompt_tokens', 'N/A'),
+                response.get('completion_tokens', 'N/A'), response.get('response_time_ms', 'N/A'))
+
+            summary_result = response.get("response", "")
+            prompt_tokens = response.get("prompt_tokens", 0)
+            completion_tokens = response.get("completion_tokens", 0)
+            return self._complete_job(job, summary_result, prompt_tokens + completion_tokens)
+
+        except Exception as e:
+            error_msg = f"Erreur lors de l'appel à l'IA: {str(e)}"
+            global_logger.error("  LLM ❌ %s", error_msg)
+            job['db_update_payload'].update({
+                'not_supported': True,
+                'not_supported_reason': error_msg
+            })
+            job['log_entry'] = f"{job['log_message_prefix']} Échec de génération de résumé ({error_msg})."
+            return job
+
+    def _summarize_job_batch(self, jobs: List[dict]) -> List[dict]:
+        """
+        Génère les résumés d'un lot de lignes de même type en un seul appel à l'IA.
+        Si la réponse groupée est inexploitable, chaque ligne est résumée individuellement.
+        """
+        if len(jobs) == 1:
+            return [self._summarize_single_job(jobs[0])]
+
+        generated_llm_prompt = self._build_llm_batch_prompt(jobs)
+
+        global_logger.debug("  LLM 🤖 Requête groupée (%d lignes) envoyée à l'IA...", len(jobs))
+        summaries = None
+        try:
+            response = self._chat_predict(generated_llm_prompt)
+            global_logger.info(
+                "  LLM ✅ Réponse groupée reçue - Modèle: %s, Tokens prompt: %s, Tokens complétion: %s, Temps: %sms",
+                response.get('model', 'N/A'), response.get('prompt_tokens', 'N/A'),
+                response.get('completion_tokens', 'N/A'), response.get('response_time_ms', 'N/A'))
+            summaries = self._parse_batch_summaries(response.get("response", ""), len(jobs))
+        except Exception as e:
+            global_logger.error("  LLM ❌ Erreur lors de l'appel groupé à l'IA: %s", e)
+
+        if summaries is None:
+            global_logger.warning(
+                "  ⚠️ Réponse groupée inexploitable pour %s lignes, traitement ligne par ligne...", len(jobs))
+            return [self._summarize_single_job(job) for job in jobs]
+
+        # Les tokens du lot sont répartis équitablement entre ses lignes.
+        total_tokens = response.get("prompt_tokens", 0) + response.get("completion_tokens", 0)
+        tokens_per_line = round(total_tokens / len(jobs))
+        return [self._complete_job(job, summary, tokens_per_line) for job, summary in zip(jobs, summaries)]
+
+    def _store_job_result(self, job: dict, processed_line_logs: io.StringIO,
+                          pending_updates: List[Tuple[int, Dict[str, Any]]],
+                          pending_summaries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Met en attente la mise à jour en base d'une ligne (et de son résumé à mettre en cache)
+        et conserve son entrée de log. Les mises à jour sont écrites par lots de UPDATE_BATCH_SIZE
+        (voir _flush_pending_updates).
+        Appelée uniquement depuis le thread qui orchestre le traitement (un seul écrivain).
+        """
+        if job['summary_to_cache']:
+            pending_summaries.append((job['cache_key'], job['summary_to_cache']))
+        pending_updates.append((job['line_id'], job['db_update_payload']))
+        if len(pending_updates) >= self.UPDATE_BATCH_SIZE:
+            self._flush_pending_updates(pending_updates, pending_summaries)
+        if job['log_entry']:
+            # Entrées écrites au fil de l'eau dans un tampon unique, séparées par LOG_SEPARATOR.
+            if processed_line_logs.tell():
+                processed_line_logs.write(self.LOG_SEPARATOR)
+            processed_line_logs.write(job['log_entry'])
+
+    def _flush_pending_updates(self, pending_updates: List[Tuple[int, Dict[str, Any]]],
+                               pending_summaries: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Écrit en base, en une seule transaction, les mises à jour et les résumés à mettre en cache
+        en attente, puis vide les listes.
+        """
+        if not pending_updates and not pending_summaries:
+            return
+        updated_count = self.db_handler.update_changelog_lines_bulk(pending_updates, pending_summaries)
+        global_logger.debug("  💾 %d ligne(s) mise(s) à jour dans la base de données.", updated_count)
+        pending_updates.clear()
+        pending_summaries.clear()
 
     def process_changelog_lines_refactored(self,
                                            process_limit: int = 1000):
         """
         Traite les lignes du changelog en enrichissant chaque entrée.
         Utilise self.db_handler et self.github_service.
+
+        Les appels réseau (GitHub, IA) sont exécutés en parallèle dans un pool de threads :
+        chaque ligne est d'abord préparée (PR + diff), puis les lignes prêtes sont résumées
+        par lots de LLM_BATCH_SIZE lignes de même type. Les mises à jour en base restent
+        sérialisées dans le thread appelant.
+
+        Si le quota GitHub s'épuise en cours de route, les lignes pas encore préparées ne sont plus
+        envoyées et celles dont la préparation a échoué pendant l'épuisement ne sont pas enregistrées :
+        elles restent à traiter (is_done = FALSE) et seront reprises par la prochaine exécution.
+        Les lignes préparées avant l'épuisement sont résumées et enregistrées normalement.
+
+        Args:
+            process_limit (int, optional): Nombre maximal de lignes traitées. Par défaut 1000.
         """
         lines_to_process = self.db_handler.get_lines_to_process(limit=process_limit)
         if not lines_to_process:
             global_logger.info("ℹ️ Aucune ligne à traiter dans la base de données.")
             return None  # Maintenir la compatibilité du retour
 
-        global_logger.info(f"🚀 Début du traitement de {len(lines_to_process)} lignes du changelog...")
-        processed_line_logs = []
-        for line_row in lines_to_process:
-            try:
-                log_entry = self._process_single_changelog_line(line_row)
-                if log_entry:
-                    processed_line_logs.append(log_entry)
-
-            except Exception as e:
-                # Si une erreur INATTENDUE se produit pendant le traitement d'UNE SEULE ligne,
-                # on "l'attrape" ici.
-                line_id = line_row.get('id', 'ID_INCONNU')  # Récupérer l'ID pour un bon log
-
-                # On enregistre l'erreur pour savoir ce qui s'est passé et sur quelle ligne.
-                global_logger.error(
-                    f"❌ Erreur inattendue lors du traitement de la ligne ID {line_id}. L'erreur est : {e}")
-
+        global_logger.info("🚀 Début du traitement de %s lignes du changelog...", len(lines_to_process))
+        self._prefetch_pr_details(lines_to_process)
+        processed_line_logs = io.StringIO()
+        rate_limited_count = 0  # Lignes laissées à traiter pour cause de quota GitHub épuisé
+        pending_updates: List[Tuple[int, Dict[str, Any]]] = []
+        pending_summaries: List[Tuple[str, Dict[str, Any]]] = []  # (clé, résumé) pour summary_cache
+        pending_jobs_by_type: Dict[Optional[str], List[dict]] = {}
+        try:
+            # Le pool doit pouvoir occuper tous les créneaux d'appel à l'IA et à GitHub.
+            pool_size = max(self.MAX_WORKERS, self.LLM_CONCURRENCY, self.github_service.MAX_CONCURRENT_REQUESTS)
+            # Le pool de préchargement est fermé après celui des lignes, une fois toutes les préparations terminées.
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="diff-prefetch") as prefetch_executor, \
+                    ThreadPoolExecutor(max_workers=pool_size) as executor:
+                self._prefetch_executor = prefetch_executor
+                summary_futures = {}
+                prepare_futures = {
+                    executor.submit(self._prepare_line_within_rate_limit, line_row): line_row.id
+                    for line_row in lines_to_process
+                }
+                for future in as_completed(prepare_futures):
+                    try:
+                        job = future.result()
+                    except Exception as e:
+                        # Si une erreur INATTENDUE se produit pendant le traitement d'UNE SEULE ligne,
+                        # on "l'attrape" ici et on l'enregistre pour savoir sur quelle ligne.
+                        global_logger.error(
+                            "❌ Erreur inattendue lors du traitement de la ligne ID %s. L'erreur est : %s",
+                            prepare_futures[future], e)
+                        continue
+
+                    if job is None or job['rate_limited']:
+                        # Préparation sautée ou échouée faute de quota GitHub : la ligne n'est pas enregistrée.
+                        rate_limited_count += 1
+                        continue
+
+                    if job['prompt_fields'] is None:
+                        self._store_job_result(job, processed_line_logs, pending_updates, pending_summaries)
+                        continue
+
+                    # Résumé déjà obtenu lors d'une exécution précédente : pas de nouvel appel à l'IA.
+                    # (Les réponses de l'IA ne sont pas déterministes sauf à temperature=0 :
+                    # le cache fige le premier résumé obtenu pour cette ligne.)
+                    cached_summary = self.db_handler.get_cached_summary(job['cache_key'])
+                    if cached_summary:
+                        global_logger.debug("  LLM ♻️ Résumé de la ligne ID %s trouvé dans le cache.", job['line_id'])
+                        self._complete_job(job, cached_summary['response'], cached_summary.get('total_tokens', 0))
+                        job['summary_to_cache'] = None  # Déjà en cache
+                        self._store_job_result(job, processed_line_logs, pending_updates, pending_summaries)
+                        continue
+
+                    # Les lignes prêtes sont regroupées par type ; un lot complet part immédiatement vers l'IA.
+                    batch = pending_jobs_by_type.setdefault(job['changelog_type'], [])
+                    batch.append(job)
+                    if len(batch) >= self.LLM_BATCH_SIZE:
+                        summary_futures[executor.submit(self._summarize_job_batch, batch)] = batch
+                        pending_jobs_by_type[job['changelog_type']] = []
+
+                for batch in pending_jobs_by_type.values():
+                    if batch:
+                        summary_futures[executor.submit(self._summarize_job_batch, batch)] = batch
+
+                for future in as_completed(summary_futures):
+                    try:
+                        jobs = future.result()
+                    except Exception as e:
+                        line_ids = [job['line_id'] for job in summary_futures[future]]
+                        global_logger.error(
+                            "❌ Erreur inattendue lors du résumé des lignes ID %s. L'erreur est : %s", line_ids, e)
+                        continue
+                    for job in jobs:
+                        self._store_job_result(job, processed_line_logs, pending_updates, pending_summaries)
+        finally:
+            self._prefetch_executor = None
+            # Les lignes déjà traitées sont écrites même si le traitement est interrompu.
+            self._flush_pending_updates(pending_updates, pending_summaries)
+
+        if rate_limited_count:
+            reset_at = self.github_service.rate_limit_exhausted_until()
+            global_logger.warning(
+                "⏸️ Quota d'API GitHub épuisé : %s ligne(s) laissée(s) à traiter. "
+                "Relancez le traitement après %s pour les reprendre.",
+                rate_limited_count,
+                time.strftime('%H:%M:%S', time.localtime(reset_at)) if reset_at else "sa réinitialisation")
         global_logger.info("\n🏁 Traitement des lignes terminé.")
-        if processed_line_logs:
-            return self.LOG_SEPARATOR.join(processed_line_logs)
+        if processed_line_logs.tell():
+            return processed_line_logs.getvalue()
         return None
 
+    def _prepare_line_within_rate_limit(self, line_row: ChangelogRow) -> Optional[Dict[str, Any]]:
+        """
+        Prépare une ligne, sauf si le quota GitHub est épuisé : retourne alors None, sans appel réseau.
+        Une ligne dont la préparation échoue alors que le quota vient de s'épuiser est marquée
+        'rate_limited' : son échec vient du quota et non de la ligne elle-même.
+        """
+        if self.github_service.rate_limit_exhausted_until() is not None:
+            return None
+        job = self._prepare_single_changelog_line(line_row)
+        if (job['prompt_fields'] is None and line_row.line_content is not None
+                and self.github_service.rate_limit_exhausted_until() is not None):
+            job['rate_limited'] = True
+        return job
+
     def _search_pr_by_description(self, line_content: str):
         """
         Recherche une PR par description (contenu de la ligne).
         Retourne (pr_details, pr_number, pr_link, method) ou (None, None, None, None) et une raison d'échec.
         """
-        global_logger.info("  PR 🔍 Recherche de PR par description...")
+        global_logger.debug("  PR 🔍 Recherche de PR par description...")
         search_term_full = line_content.strip()
 
+        # Pré-filtrage sans appel réseau : une ligne sans lettre (tirets, ponctuation) ou de moins de
+        # trois mots ne peut pas désigner une PR unique par recherche textuelle.
+        if not any(char.isalpha() for char in search_term_full) or search_term_full.count(' ') < 2:
+            reason = f"{self.MSG_NON_INDEXABLE_LINE}: '{search_term_full[:60]}'"
+            global_logger.error("  ⚠️ %s", reason)
+            return None, None, None, None, reason
+
         search_term = search_term_full.split(":", 1)[1].strip() if ":" in search_term_full and len(
             search_term_full.split(":", 1)[1].strip()) > 10 else search_term_full
         search_term = search_term[:150]  # Limiter la longueur
 
         if len(search_term) < 10:
             reason = f"Terme de recherche trop court: '{search_term}'"
-            global_logger.error(f"  ⚠️ {reason}")
+            global_logger.error("  ⚠️ %s", reason)
             return None, None, None, None, reason
 
-        found_prs = self.github_service.search_prs_by_text(search_term, only_merged=True)
+        is_cached, found_prs = self._pr_search_cache.lookup(search_term)
+        if not is_cached:
+            found_prs = self.github_service.search_prs_by_text(search_term, only_merged=True)
+            self._pr_search_cache.store(search_term, found_prs)
 
         if not found_prs or not isinstance(found_prs, list):
             reason = f"Aucune PR trouvée ou erreur de recherche pour '{search_term}'."
-            global_logger.error(f"  PR ❌ {reason}")
+            global_logger.error("  PR ❌ %s", reason)
             return None, None, None, None, reason
 
         if len(found_prs) == 1:
@@ -313,21 +717,26 @@ class ChangelogProcessor:
             pr_number_from_search = pr_data_from_search.get('number')
             if not pr_number_from_search:
                 reason = f"PR trouvée par recherche sans numéro: {pr_data_from_search.get('title', 'N/A')}"
-                global_logger.error(f"  ⚠️ {reason}")
+                global_logger.error("  ⚠️ %s", reason)
                 return None, None, None, None, reason
 
             global_logger.error(
-                f"  PR ✅ Une seule PR trouvée par recherche : #{pr_number_from_search} - {pr_data_from_search.get('title', 'N/A')}")
-            pr_details, pr_link = self.get_pr_details_by_number(pr_number_from_search)  # Utilise la méthode existante
+                "  PR ✅ Une seule PR trouvée par recherche : #%s - %s",
+                pr_number_from_search, pr_data_from_search.get('title', 'N/A'))
+            if pr_data_from_search.get('html_url'):
+                # Le résultat de recherche porte déjà titre, description et lien : pas d'appel de détails.
+                pr_details, pr_link = pr_data_from_search, pr_data_from_search['html_url']
+            else:
+                pr_details, pr_link = self.get_pr_details_by_number(pr_number_from_search)  # Utilise la méthode existante
             if pr_details:
                 return pr_details, pr_number_from_search, pr_link, "search", None  # Ajout de la méthode d'identification
             else:
                 reason = f"Impossible de récupérer les détails pour la PR #{pr_number_from_search} trouvée par recherche."
-                global_logger.error(f"  ⚠️ {reason}")
+                global_logger.error("  ⚠️ %s", reason)
                 return None, None, None, None, reason
         else:
             reason = f"{len(found_prs)} PRs trouvées pour '{search_term}', ambiguïté."
-            global_logger.error(f"  PR ⚠️ {reason}")
+            global_logger.error("  PR ⚠️ %s", reason)
             return None, None, None, None, reason
 
     def _attempt_pr_identification(self, line_content: str):
@@ -338,15 +747,32 @@ class ChangelogProcessor:
         pr_number_from_text = self.parser.extract_pr_number_from_text(line_content)
 
         if pr_number_from_text:
-            global_logger.info(f"  PR #️⃣ Numéro PR {pr_number_from_text} extrait du texte.")
+            global_logger.debug("  PR #️⃣ Numéro PR %s extrait du texte.", pr_number_from_text)
+            # Le numéro est connu : le diff est téléchargé pendant la récupération des détails
+            # (il est mémorisé dans _pr_diff_cache et relu ensuite par _prepare_single_changelog_line).
+            # Inutile si les détails sont déjà en cache (préchargés, ou PR connue comme inexistante).
+            diff_prefetch = None
+            if self._prefetch_executor is not None and not self._pr_details_cache.lookup(pr_number_from_text)[0]:
+                diff_prefetch = self._prefetch_executor.submit(self.get_pr_diff_excerpt, pr_number_from_text)
             pr_details, pr_link = self.get_pr_details_by_number(pr_number_from_text)
+            if diff_prefetch is not None:
+                if pr_details:
+                    diff_prefetch.result()
+                else:
+                    # Pas de diff à lire pour cette PR : le préchargement est annulé s'il n'a pas commencé.
+                    diff_prefetch.cancel()
             if pr_details:
                 return {'status': 'success', 'pr_details': pr_details, 'pr_number': pr_number_from_text,
                         'pr_link': pr_link, 'method': 'direct_extraction'}
+            elif pr_details is NOT_FOUND:
+                # Le numéro cité est faux : une recherche textuelle risquerait de retenir une autre PR.
+                return {'status': 'failure',
+                        'reason': f"PR #{pr_number_from_text} (extraite directement) inexistante."}
             else:
                 # Ne pas retourner échec ici, tenter la recherche par description
                 global_logger.warning(
-                    f"  ⚠️ Détails PR #{pr_number_from_text} (extraite directement) non récupérables, tentative par recherche...")
+                    "  ⚠️ Détails PR #%s (extraite directement) non récupérables, tentative par recherche...",
+                    pr_number_from_text)
 
         pr_details_search, pr_number_search, pr_link_search, method_search, reason_search = self._search_pr_by_description(
             line_content)
@@ -358,68 +784,93 @@ class ChangelogProcessor:
         final_reason = reason_search or f'Détails PR #{pr_number_from_text} (extraite directement) non récupérables et recherche infructueuse.' if pr_number_from_text else reason_search
         return {'status': 'failure', 'reason': final_reason or self.DEFAULT_PR_IDENTIFICATION_FAILURE_REASON}
 
-    def determine_line_type_and_process_db(self, section_lines: list[str]):  # db_handler est maintenant self.db_handler
+    def determine_line_type_and_process_db(self, section_lines: Optional[list[str]] = None,
+                                           section_text: Optional[str] = None):  # db_handler est maintenant self.db_handler
         """
         Détermine le type de chaque ligne de contenu pertinente et l'insère dans la base de données.
         Utilise self.db_handler.
+
+        Args:
+            section_lines (Optional[list[str]]): Lignes de la section, déjà découpées.
+            section_text (Optional[str]): Texte brut de la section ; prioritaire sur section_lines
+                car il est analysé directement, sans reconstitution du texte.
         """
-        global_logger.info(f"ℹ️ Préparation de l'insertion des lignes de contenu dans la table {self.db_handler.table_name}...")
-        current_db_line_type = None
-        lines_inserted_count = 0
-        warning_preamble_line_to_skip = "the following changes may create regressions for some external modules, but were necessary to make dolibarr better:"
-
-        # Optimisation: créer des ensembles pour les vérifications de chaînes constantes en minuscules
-        user_section_triggers = {"for users:"}
-        dev_section_triggers = {"for developers:", "warning:"}  # "warning:" assigne aussi le type 'dev'
-        main_header_prefix = "***** changelog for "  # en minuscules pour la comparaison
-
-        for line_text in section_lines:
-            stripped_line = line_text.strip()
-            stripped_line_lower = stripped_line.lower()
-
-            if not stripped_line:
-                continue
-
-            if stripped_line_lower in user_section_triggers:
-                current_db_line_type = "user"
-                global_logger.info(f" Contexte changé à : {current_db_line_type}")
-                continue
-            elif stripped_line_lower in dev_section_triggers:
-                current_db_line_type = "dev"
-                global_logger.info(f" Contexte changé à : {current_db_line_type} (section: {stripped_line_lower})")
-                continue
-            elif stripped_line_lower.startswith(main_header_prefix) and stripped_line.endswith("*****"):
-                current_db_line_type = None
-                continue
-            elif re.fullmatch(r"^-+$", stripped_line):
-                continue
-            elif stripped_line_lower == warning_preamble_line_to_skip:
-                global_logger.info(f"  Ligne de préambule Warning ignorée : {stripped_line[:60]}...")
-                continue
-
-            inserted_id = self.db_handler.insert_changelog_line(
-                line_content=stripped_line,  # Insérer la ligne nettoyée
-                line_type=current_db_line_type
-            )
-            if inserted_id is not None:
-                lines_inserted_count += 1
+        global_logger.info("ℹ️ Préparation de l'insertion des lignes de contenu dans la table %s...", self.db_handler.table_name)
+        if section_text is None:
+            section_text = "\n".join(section_lines or [])
+        # Toutes les lignes sont insérées en une seule transaction (un seul fsync) :
+        # le générateur est consommé par paquets, sans matérialiser la section entière.
+        lines_inserted_count = self.db_handler.insert_changelog_lines_bulk(
+            self.parser.iter_classified_lines(section_text))
 
         global_logger.info(
-            f"✅ {lines_inserted_count} nouvelle(s) ligne(s) de contenu insérée(s) dans la table {self.db_handler.table_name}.")
+            "✅ %s nouvelle(s) ligne(s) de contenu insérée(s) dans la table %s.",
+            lines_inserted_count, self.db_handler.table_name)
 
     def get_pr_details_by_number(self, pr_number: int):
         """
         Récupère les détails et le lien d'une PR via son numéro.
+        Le résultat est mémorisé : les lignes qui référencent la même PR ne refont pas l'appel.
+        """
+        is_cached, result = self._pr_details_cache.lookup(pr_number)
+        if not is_cached:
+            result = self._fetch_pr_details_by_number(pr_number)
+            self._pr_details_cache.store(pr_number, result)
+        return result
+
+    def _prefetch_pr_details(self, lines_to_process: List[ChangelogRow]) -> None:
+        """
+        Récupère en quelques requêtes GraphQL groupées les détails des PRs dont le numéro figure
+        dans le texte des lignes, et les place dans _pr_details_cache : la préparation de chaque ligne
+        n'a plus d'appel REST à faire pour ces PRs. Les PRs non obtenues seront demandées une par une.
+        """
+        pr_numbers = []
+        for line_row in lines_to_process:
+            pr_number = self.parser.extract_pr_number_from_text(line_row.line_content)
+            if pr_number and not self._pr_details_cache.lookup(pr_number)[0]:
+                pr_numbers.append(pr_number)
+        if not pr_numbers:
+            return
+
+        prefetched = self.github_service.fetch_prs_graphql(pr_numbers)
+        for pr_number, pr_details in prefetched.items():
+            self._pr_details_cache.store(pr_number, self._pr_details_result(pr_number, pr_details))
+        global_logger.info("ℹ️ Détails de %s PR(s) préchargés via GraphQL.", len(prefetched))
+
+    def get_pr_diff_excerpt(self, pr_number: int) -> Optional[str]:
+        """
+        Récupère les MAX_DIFF_LENGTH premiers caractères du diff d'une PR (seule partie utilisée).
+        Le résultat est mémorisé comme les détails de PR.
+        """
+        is_cached, pr_diff_content = self._pr_diff_cache.lookup(pr_number)
+        if not is_cached:
+            pr_diff_content = self.github_service.get_pr_diff(pr_number, max_chars=self.MAX_DIFF_LENGTH)
+            self._pr_diff_cache.store(pr_number, pr_diff_content)
+        return pr_diff_content
+
+    def _fetch_pr_details_by_number(self, pr_number: int):
         """
-        global_logger.info(f"  PR INFO ↔️ Tentative de récupération des détails pour PR #{pr_number}")
-        pr_details = self.github_service.get_pr_details(pr_number)
+        Interroge GitHub pour les détails et le lien d'une PR.
+        Retourne (NOT_FOUND, None) si la PR n'existe pas, (None, None) en cas d'erreur passagère.
+        """
+        global_logger.debug("  PR INFO ↔️ Tentative de récupération des détails pour PR #%s", pr_number)
+        return self._pr_details_result(pr_number, self.github_service.get_pr_details(pr_number))
+
+    @staticmethod
+    def _pr_details_result(pr_number: int, pr_details: Any):
+        """
+        Met en forme (détails, lien) la réponse de GitHub pour une PR, telle que mémorisée dans _pr_details_cache.
+        """
+        if pr_details is NOT_FOUND:
+            global_logger.error("  ⚠️ La PR #%s n'existe pas.", pr_number)
+            return NOT_FOUND, None
         if pr_details:
             pr_link = pr_details.get('html_url')
             if not pr_link:
-                global_logger.warning(f"  ⚠️ PR #{pr_number}: html_url non trouvé dans les détails.")
+                global_logger.warning("  ⚠️ PR #%s: html_url non trouvé dans les détails.", pr_number)
             # S'assurer de retourner une structure cohérente même si le lien est manquant
             return pr_details, pr_link if pr_link else f"https://github.com/Dolibarr/dolibarr/pull/{pr_number}"  # Lien par défaut
-        global_logger.error(f"  ⚠️ Impossible de récupérer les détails pour la PR #{pr_number}.")
+        global_logger.error("  ⚠️ Impossible de récupérer les détails pour la PR #%s.", pr_number)
         return None, None
 
     def summarize_by_theme(self, aggregated_summaries: str, writer: 'ChangelogWriter'):
@@ -437,8 +888,24 @@ class ChangelogProcessor:
                 "  ⚠️ Le contenu des résumés est vide. Impossible de lancer le regroupement thématique.")
             return
 
+        # Les entrées dont le résumé se limite à INSUFFICIENT_INFO_MSG n'apportent rien au regroupement :
+        # elles ne sont pas envoyées (moins de tokens facturés, réponse plus rapide).
+        # AIGatewayClient n'offrant pas de réponse en flux, une complétion unitaire ne peut pas être
+        # interrompue dès que l'IA commence par INSUFFICIENT_INFO_MSG : ce filtrage en tient lieu.
+        entries = aggregated_summaries.split(self.LOG_SEPARATOR)
+        useful_entries = [entry for entry in entries
+                          if not entry.rstrip().rstrip(".'\" ").endswith(self.INSUFFICIENT_INFO_MSG.rstrip("."))]
+        if len(useful_entries) < len(entries):
+            global_logger.info(
+                "  ℹ️ %s entrée(s) sans information suffisante écartée(s) de la synthèse.",
+                len(entries) - len(useful_entries))
+        if not useful_entries:
+            global_logger.warning("  ⚠️ Aucun résumé exploitable. Impossible de lancer le regroupement thématique.")
+            return
+
         # Préparation du prompt final
-        final_prompt = self.THEMATIC_SUMMARY_PROMPT_TEMPLATE.format(aggregated_summaries=aggregated_summaries)
+        final_prompt = self.THEMATIC_SUMMARY_PROMPT_TEMPLATE.format(
+            aggregated_summaries=self.LOG_SEPARATOR.join(useful_entries))
 
         global_logger.info("  🤖 Envoi de la requête de synthèse thématique à l'IA...")
         try:
@@ -447,7 +914,8 @@ class ChangelogProcessor:
                 messages=[{"role": "user", "content": final_prompt}]
             )
             global_logger.info(
-                f"  ✅ Réponse de synthèse thématique reçue - Modèle: {response.get('model', 'N/A')}, Tokens totaux: {response.get('prompt_tokens', 0) + response.get('completion_tokens', 0)}")
+                "  ✅ Réponse de synthèse thématique reçue - Modèle: %s, Tokens totaux: %s",
+                response.get('model', 'N/A'), response.get('prompt_tokens', 0) + response.get('completion_tokens', 0))
 
             themed_summary = response.get("response", "")
 
@@ -455,12 +923,12 @@ class ChangelogProcessor:
                 # Sauvegarde du fichier final formaté en Markdown
                 output_filename = 'data/changelog_final_themed.md'
                 writer.save_text_block(themed_summary, output_filename)
-                global_logger.info(f"  📄 Changelog final thématisé et sauvegardé dans '{output_filename}'.")
+                global_logger.info("  📄 Changelog final thématisé et sauvegardé dans '%s'.", output_filename)
             else:
                 global_logger.error("  ❌ L'IA n'a retourné aucun contenu pour la synthèse thématique.")
 
         except Exception as e:
-            global_logger.error(f"  ❌ Erreur critique lors de la tentative de synthèse thématique par l'IA : {e}")
+            global_logger.error("  ❌ Erreur critique lors de la tentative de synthèse thématique par l'IA : %s", e)
 
         global_logger.info("\n✅ Regroupement thématique terminé.")
 
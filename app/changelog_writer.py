@@ -1,12 +1,47 @@
 # app/changelog_writer.py
 import os
-from typing import List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Set
 from app.logger import global_logger
 
 class ChangelogWriter:
     """
     Écrit des données de changelog dans des fichiers.
     """
+    WRITE_BUFFER_SIZE = 1 << 20
+    # Répertoires déjà créés/vérifiés : évite un appel système par sauvegarde.
+    _ensured_dirs: Set[str] = set()
+
+    def __init__(self) -> None:
+        # Sauvegardes différées (voir save_lines_to_file_in_background), écrites une à une, dans l'ordre.
+        self._background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="changelog-writer")
+        self._pending_writes: List[Future] = []
+
+    def _ensure_parent_dir(self, filename: str) -> None:
+        """
+        S'assure que le répertoire de destination existe (rien à faire pour un fichier du répertoire courant).
+        """
+        directory = os.path.dirname(filename)
+        if directory and directory not in self._ensured_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._ensured_dirs.add(directory)
+
+    def _write_to_path(self, content: str, filename: str) -> bool:
+        """
+        Écrit le contenu dans le fichier en une seule écriture, à travers un tampon élargi (1 Mio).
+        Le répertoire de destination est créé si besoin.
+
+        Returns:
+            bool: True si l'écriture est réussie, False sinon (l'erreur est journalisée).
+        """
+        try:
+            self._ensure_parent_dir(filename)
+            with open(filename, 'w', encoding='utf-8', buffering=self.WRITE_BUFFER_SIZE) as f:
+                f.write(content)
+            return True
+        except IOError as e:
+            global_logger.error("❌ Erreur lors de la sauvegarde du fichier %s : %s", filename, e)
+            return False
 
     def save_lines_to_file(self, lines: List[str], version_tag: str, filename_template: str = "data/changelog_v{}.txt") -> bool:
         """
@@ -25,18 +60,34 @@ class ChangelogWriter:
             return False
 
         filename = filename_template.format(version_tag)
-        try:
-            # S'assure que le répertoire de destination existe
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                for line in lines:
-                    f.write(line + '\n')
-            global_logger.info(f"✅ Changelog pour la version {version_tag} sauvegardé dans : {filename}")
-            return True
-        except IOError as e:
-            global_logger.error(f"❌ Erreur lors de la sauvegarde du fichier {filename} : {e}")
+        if not self._write_to_path('\n'.join(lines) + '\n', filename):
             return False
+        global_logger.info("✅ Changelog pour la version %s sauvegardé dans : %s", version_tag, filename)
+        return True
+
+    def save_lines_to_file_in_background(self, lines: List[str], version_tag: str,
+                                         filename_template: str = "data/changelog_v{}.txt") -> Future:
+        """
+        Comme save_lines_to_file, mais l'écriture est faite par un thread dédié : l'appelant
+        poursuit immédiatement. Les lignes ne doivent plus être modifiées ensuite.
+        Voir wait_for_pending_writes pour attendre la fin des écritures.
+
+        Returns:
+            Future: Le résultat (bool) de save_lines_to_file.
+        """
+        future = self._background_executor.submit(self.save_lines_to_file, lines, version_tag, filename_template)
+        self._pending_writes.append(future)
+        return future
+
+    def wait_for_pending_writes(self) -> bool:
+        """
+        Attend la fin des sauvegardes différées en cours.
+
+        Returns:
+            bool: True si toutes ont réussi, False sinon.
+        """
+        pending_writes, self._pending_writes = self._pending_writes, []
+        return all([future.result() for future in pending_writes])
 
     def save_text_block(self, text_content: str, filename: str = "data/output.txt") -> bool:
         """
@@ -52,14 +103,7 @@ class ChangelogWriter:
         if not text_content:
             global_logger.info("ℹ️  Aucun contenu à sauvegarder.")
             return False
-        try:
-            # S'assure que le répertoire de destination existe
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(text_content)
-            global_logger.info(f"✅ Contenu sauvegardé dans : {filename}")
-            return True
-        except IOError as e:
-            global_logger.error(f"❌ Erreur lors de la sauvegarde du fichier {filename} : {e}")
-            return False
\ No newline at end of file
+        if not self._write_to_path(text_content, filename):
+            return False
+        global_logger.info("✅ Contenu sauvegardé dans : %s", filename)
+        return True
@@ -1,14 +1,58 @@
 # app/db_handler.py
+import hashlib
+import json
+import logging
 import os
+import random
 import sqlite3
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Dict, Any, Sequence, Set, Tuple, Union
 from app.logger import global_logger
 
+
+class ChangelogRow(NamedTuple):
+    """
+    Ligne du changelog à traiter, telle que lue par get_lines_to_process avec ses colonnes par défaut
+    (DbHandler.DEFAULT_PENDING_COLUMNS, dans le même ordre).
+    """
+    id: int
+    line_content: str
+    type: Optional[str]
+
+
 class DbHandler:
     """
     Gère les données du changelog stockées dans une base de données SQLite.
     Chaque instance gère les opérations pour une version spécifique du changelog.
     """
+    # Colonnes ajoutées après la création initiale du schéma : (nom, type SQL).
+    _MIGRATED_COLUMNS = (("pr_title", "TEXT"), ("pr_body", "TEXT"), ("line_hash", "INTEGER"),
+                         ("estimated_prompt_tokens", "INTEGER"))
+    _CONNECTION_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-64000",
+        "PRAGMA busy_timeout=30000",
+    )
+    # Réglages du chargement initial (voir bulk_load) puis réglages rétablis ensuite.
+    INSERT_CHUNK_SIZE = 5000  # Lignes par executemany lors d'une insertion groupée
+    _CACHED_STATEMENTS = 256  # Requêtes préparées conservées par la connexion (128 par défaut)
+    _MAX_SQL_VARIABLES = 999  # Limite historique (et minimale) de paramètres par requête SQLite
+    _PENDING_CONDITION = "is_done = FALSE AND not_supported = FALSE"  # Lignes restant à traiter
+    # Colonnes du changelog pouvant être lues par get_lines_to_process.
+    _ALLOWED_COLUMNS = frozenset((
+        "id", "type", "line_hash", "line_content", "not_supported", "not_supported_reason", "is_done",
+        "pr_title", "pr_body", "link", "diff", "desc_and_diff_tokens", "estimated_prompt_tokens",
+    ))
+    DEFAULT_PENDING_COLUMNS = ("id", "line_content", "type")
+    _SAMPLE_MAX_ATTEMPTS = 5  # Tirages d'ids avant de compléter depuis la liste des ids restants
+    # Bases dont le journal est déjà passé en WAL dans ce processus.
+    _wal_enabled_paths: Set[str] = set()
+    # Bases dont les tables partagées (caches, métadonnées) ont été créées dans ce processus.
+    _shared_tables_paths: Set[str] = set()
 
     def __init__(self, version: str, db_name: str = "changelog_parser.sqlite3") -> None:
         """
@@ -27,111 +71,669 @@ class DbHandler:
 
         sanitized_version_string = str(version).replace('.', '_')
         self.table_name = f"changelog_dolibarr_line_v{sanitized_version_string}"
+        # Cache des résumés IA, partagé entre toutes les versions.
+        self.summary_cache_table_name = "summary_cache"
+        # Cache des réponses brutes de l'IA par prompt (voir LLMCachedClient), partagé lui aussi.
+        self.llm_cache_table_name = "llm_cache"
+        # Réponses GitHub revalidées par ETag / Last-Modified (voir GitHubService), partagées également.
+        self.http_cache_table_name = "http_cache"
+        # Métadonnées clé / valeur (ex: ETag et contenu du dernier ChangeLog téléchargé).
+        self.meta_table_name = "meta"
+
+        # Requêtes construites une fois, les noms de tables étant fixes pour l'instance : leur texte
+        # constant est réutilisé tel quel par le cache de requêtes préparées de sqlite3.
+        self._insert_sql = f"INSERT INTO {self.table_name} (line_hash, line_content, type) VALUES (?, ?, ?)"
+        self._insert_or_ignore_sql = (
+            f"INSERT OR IGNORE INTO {self.table_name} (line_hash, line_content, type) VALUES (?, ?, ?)"
+        )
+        self._update_sql_by_keys: Dict[Tuple[str, ...], str] = {}  # colonnes triées -> UPDATE ... WHERE id = ?
+        # (colonnes, tri) -> SELECT des lignes à traiter ; la limite est un paramètre (-1 : sans limite).
+        self._select_pending_sql_by_key: Dict[Tuple[str, str], str] = {}
+        self._select_pending_bounds_sql = (
+            f"SELECT MIN(id), MAX(id) FROM {self.table_name} WHERE {self._PENDING_CONDITION}"
+        )
+        self._select_pending_ids_sql = f"SELECT id FROM {self.table_name} WHERE {self._PENDING_CONDITION}"
+        self._select_cached_summary_sql = (
+            f"SELECT response_json FROM {self.summary_cache_table_name} WHERE cache_key = ?"
+        )
+        self._save_cached_summary_sql = (
+            f"INSERT OR REPLACE INTO {self.summary_cache_table_name} (cache_key, response_json) VALUES (?, ?)"
+        )
+        self._select_cached_llm_response_sql = (
+            f"SELECT response_json FROM {self.llm_cache_table_name} WHERE prompt_hash = ? AND created_at >= ?"
+        )
+        self._save_cached_llm_response_sql = (
+            f"INSERT OR REPLACE INTO {self.llm_cache_table_name}"
+            " (prompt_hash, response_json, prompt_tokens, completion_tokens, created_at) VALUES (?, ?, ?, ?, ?)"
+        )
+        self._select_cached_http_response_sql = (
+            f"SELECT etag, last_modified, value_json FROM {self.http_cache_table_name} WHERE cache_key = ?"
+        )
+        self._save_cached_http_response_sql = (
+            f"INSERT OR REPLACE INTO {self.http_cache_table_name}"
+            " (cache_key, etag, last_modified, value_json, updated_at) VALUES (?, ?, ?, ?, ?)"
+        )
+        self._select_meta_sql = f"SELECT meta_value FROM {self.meta_table_name} WHERE meta_key = ?"
+        self._save_meta_sql = f"INSERT OR REPLACE INTO {self.meta_table_name} (meta_key, meta_value) VALUES (?, ?)"
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connexion unique de l'instance, ouverte au premier usage puis réutilisée : le cache de pages
+        SQLite reste chaud d'une opération à l'autre. Partagée entre threads, elle ne doit être
+        utilisée que sous self._lock.
+        """
+        if self._conn is None:
+            self._conn = self._open_connection()
+        return self._conn
 
-    def _get_db_connection(self) -> sqlite3.Connection:
+    def _open_connection(self) -> sqlite3.Connection:
         """
         Établit et retourne une connexion à la base de données.
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=self._CACHED_STATEMENTS)
         conn.row_factory = sqlite3.Row
+        # Réglages propres à chaque connexion : moins de fsync par commit, tables temporaires
+        # en mémoire, cache de 64 Mo, et attente (plutôt qu'échec) si la base est verrouillée.
+        for pragma in self._CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        # Le mode WAL est persistant dans le fichier : il n'est activé qu'une fois par processus.
+        if self.db_path not in DbHandler._wal_enabled_paths:
+            journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if journal_mode.lower() != "wal":
+                global_logger.warning("Mode WAL non activé pour %s (mode actuel : %s).", self.db_path, journal_mode)
+            DbHandler._wal_enabled_paths.add(self.db_path)
+        if self.db_path not in DbHandler._shared_tables_paths:
+            self._create_shared_tables(conn)
+            DbHandler._shared_tables_paths.add(self.db_path)
         return conn
 
+    def _create_shared_tables(self, conn: sqlite3.Connection) -> None:
+        """
+        Crée les tables communes à toutes les versions (caches et métadonnées). Elles sont créées
+        à l'ouverture de la connexion : les caches sont utilisables avant même la table de la version.
+        """
+        cursor = conn.cursor()
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.summary_cache_table_name} (
+            cache_key TEXT PRIMARY KEY,
+            response_json TEXT NOT NULL
+        )
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.llm_cache_table_name} (
+            prompt_hash TEXT PRIMARY KEY,
+            response_json TEXT NOT NULL,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            created_at INTEGER NOT NULL -- timestamp Unix
+        )
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.http_cache_table_name} (
+            cache_key TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            value_json TEXT NOT NULL,
+            updated_at INTEGER NOT NULL -- timestamp Unix
+        )
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.meta_table_name} (
+            meta_key TEXT PRIMARY KEY,
+            meta_value TEXT
+        )
+        """)
+        conn.commit()
+
+    @contextmanager
+    def bulk_load(self) -> Iterator["DbHandler"]:
+        """
+        Désactive le journal et les fsync le temps d'un chargement en masse (peuplement initial de la table),
+        puis rétablit le mode WAL et synchronous=NORMAL, même en cas d'erreur.
+        Sans journal, une interruption peut laisser la base incohérente : réservé aux données
+        que l'on peut reconstruire en relançant le script.
+
+        SQLite peut refuser de changer de journal (ex: autre connexion ouverte sur la base en WAL),
+        en ignorant la demande ou en signalant la base verrouillée : le mode obtenu est vérifié,
+        et les fsync ne sont désactivés que si le journal l'est aussi.
+        """
+        with self._lock:
+            try:
+                journal_mode = self._connection.execute("PRAGMA journal_mode=OFF").fetchone()[0]
+            except sqlite3.OperationalError as e:  # Base verrouillée par une autre connexion
+                journal_mode = None
+                global_logger.warning("Journal de %s non désactivé (%s) : chargement en masse avec journal et fsync.",
+                                      self.db_path, e)
+            bulk_mode = str(journal_mode).lower() == 'off'
+            if bulk_mode:
+                self._connection.execute("PRAGMA synchronous=OFF")
+        if bulk_mode:
+            global_logger.debug("Chargement en masse dans %s : journal et fsync désactivés.", self.db_path)
+        elif journal_mode is not None:
+            global_logger.warning(
+                "Journal de %s resté en mode %s : chargement en masse avec journal et fsync.",
+                self.db_path, journal_mode)
+        try:
+            yield self
+        finally:
+            if bulk_mode:
+                with self._lock:
+                    journal_mode = self._connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+                    self._connection.execute("PRAGMA synchronous=NORMAL")
+                if str(journal_mode).lower() != 'wal':
+                    global_logger.warning("Journal de %s non rétabli en WAL (mode %s).", self.db_path, journal_mode)
+
+    def close(self) -> None:
+        """
+        Ferme la connexion à la base. Elle sera rouverte au prochain accès si besoin.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self) -> "DbHandler":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        # __init__ a pu échouer avant la création du verrou : rien à fermer dans ce cas.
+        if getattr(self, "_lock", None) is not None:
+            self.close()
+
     def create_changelog_table(self) -> None:
         """
         Crée la table du changelog pour la version de l'instance si elle n'existe pas.
         """
-        conn = self._get_db_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT, -- 'dev' ou 'user'
-                line_content TEXT NOT NULL UNIQUE,
-                not_supported BOOLEAN DEFAULT FALSE,
-                not_supported_reason TEXT,
-                is_done BOOLEAN DEFAULT FALSE,
-                pr_desc TEXT,
-                link TEXT,
-                diff TEXT,
-                desc_and_diff_tokens INTEGER
-            )
-            """)
-            conn.commit()
-            global_logger.info(f"Table {self.table_name} vérifiée/créée dans {self.db_path}")
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT, -- 'dev' ou 'user'
+                    line_hash INTEGER NOT NULL, -- empreinte de line_content (voir line_hash), unique
+                    line_content TEXT NOT NULL,
+                    not_supported BOOLEAN DEFAULT FALSE,
+                    not_supported_reason TEXT,
+                    is_done BOOLEAN DEFAULT FALSE,
+                    pr_title TEXT,
+                    pr_body TEXT,
+                    link TEXT,
+                    diff TEXT,
+                    desc_and_diff_tokens INTEGER,
+                    estimated_prompt_tokens INTEGER -- estimation locale du prompt unitaire, avant envoi
+                )
+                """)
+                self._add_missing_columns(cursor)
+                self._backfill_line_hashes(cursor)
+                # L'unicité des lignes repose sur une clé entière de 8 octets plutôt que sur le texte complet.
+                cursor.execute(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.table_name}_line_hash
+                ON {self.table_name} (line_hash)
+                """)
+                # Index partiel limité aux lignes à traiter : get_lines_to_process n'a plus à parcourir
+                # les lignes déjà terminées, qui deviennent vite majoritaires.
+                cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{self.table_name}_pending
+                ON {self.table_name} (type) WHERE {self._PENDING_CONDITION}
+                """)
+            global_logger.info("Table %s vérifiée/créée dans %s", self.table_name, self.db_path)
         except sqlite3.Error as e:
-            global_logger.error(f"Erreur SQLite lors de la création de la table {self.table_name}: {e}")
-        finally:
-            conn.close()
+            global_logger.error("Erreur SQLite lors de la création de la table %s: %s", self.table_name, e)
+
+    def analyze(self) -> None:
+        """
+        Met à jour les statistiques de la table (ANALYZE) après son peuplement : le planificateur
+        de requêtes sait alors que l'index partiel des lignes à traiter est sélectif.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                conn.execute(f"ANALYZE {self.table_name}")
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de l'analyse de la table %s: %s", self.table_name, e)
+
+    def _add_missing_columns(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Migre une table créée par une version antérieure en ajoutant les colonnes manquantes
+        (l'ancienne colonne pr_desc, qui n'est plus alimentée, est laissée en place).
+        """
+        cursor.execute(f"PRAGMA table_info({self.table_name})")
+        existing_columns = {row['name'] for row in cursor.fetchall()}
+        for column_name, column_type in self._MIGRATED_COLUMNS:
+            if column_name not in existing_columns:
+                cursor.execute(f"ALTER TABLE {self.table_name} ADD COLUMN {column_name} {column_type}")
+                global_logger.info("Colonne %s ajoutée à la table %s.", column_name, self.table_name)
+
+    def _backfill_line_hashes(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Calcule line_hash pour les lignes d'une table créée avant l'ajout de la colonne.
+        (La contrainte UNIQUE historique sur line_content reste en place : SQLite ne permet pas
+        de la retirer sans reconstruire la table.)
+        """
+        cursor.execute(f"SELECT id, line_content FROM {self.table_name} WHERE line_hash IS NULL")
+        missing_hashes = [(self.line_hash(row['line_content']), row['id']) for row in cursor.fetchall()]
+        if missing_hashes:
+            cursor.executemany(f"UPDATE {self.table_name} SET line_hash = ? WHERE id = ?", missing_hashes)
+            global_logger.info("Empreinte line_hash calculée pour %s ligne(s) de %s.", len(missing_hashes), self.table_name)
+
+    @staticmethod
+    def line_hash(line_content: str) -> int:
+        """
+        Empreinte d'une ligne du changelog : BLAKE2b sur 8 octets, en entier signé 64 bits
+        (le type INTEGER de SQLite). Le risque de collision est négligeable à l'échelle d'un changelog.
+        """
+        digest = hashlib.blake2b(line_content.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
 
     def insert_changelog_line(self, line_content: str, line_type: Optional[str] = None) -> Optional[int]:
         """
         Insère une ligne brute du changelog dans la base de données.
         """
-        conn = self._get_db_connection()
         try:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-            INSERT INTO {self.table_name} (line_content, type)
-            VALUES (?, ?)
-            """, (line_content, line_type))
-            conn.commit()
-            return cursor.lastrowid
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._insert_sql, (self.line_hash(line_content), line_content, line_type))
+                return cursor.lastrowid
         except sqlite3.IntegrityError:
             # Cas normal si la ligne existe déjà (contrainte UNIQUE), un log de bas niveau est approprié.
-            global_logger.debug(f"La ligne existe déjà dans {self.table_name}: {line_content[:70]}...")
+            if global_logger.isEnabledFor(logging.DEBUG):
+                global_logger.debug("La ligne existe déjà dans %s: %s...", self.table_name, line_content[:70])
             return None
         except sqlite3.Error as e:
-            global_logger.error(f"Erreur SQLite lors de l'insertion dans {self.table_name}: {e}")
+            global_logger.error("Erreur SQLite lors de l'insertion dans %s: %s", self.table_name, e)
             return None
-        finally:
-            conn.close()
+
+    def insert_changelog_lines_bulk(self, rows: Iterable[Tuple[str, Optional[str]]]) -> int:
+        """
+        Insère plusieurs lignes brutes du changelog en une seule transaction.
+        Les lignes déjà présentes (contrainte UNIQUE) sont ignorées.
+        Les lignes sont consommées par paquets de INSERT_CHUNK_SIZE : un itérable (ou un générateur)
+        n'est jamais matérialisé en entier.
+
+        Args:
+            rows (Iterable[Tuple[str, Optional[str]]]): Couples (line_content, line_type) à insérer.
+
+        Returns:
+            int: Le nombre de lignes réellement insérées.
+        """
+        rows_iterator = iter(rows)
+        chunk = list(islice(rows_iterator, self.INSERT_CHUNK_SIZE))
+        if not chunk:
+            return 0
+
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                submitted_count = 0
+                inserted_count = 0
+                while chunk:
+                    cursor.executemany(self._insert_or_ignore_sql,
+                                       [(self.line_hash(line_content), line_content, line_type)
+                                        for line_content, line_type in chunk])
+                    submitted_count += len(chunk)
+                    inserted_count += cursor.rowcount
+                    chunk = list(islice(rows_iterator, self.INSERT_CHUNK_SIZE))
+                if inserted_count < submitted_count:
+                    global_logger.debug("%s ligne(s) existaient déjà dans %s.", submitted_count - inserted_count, self.table_name)
+                return inserted_count
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de l'insertion groupée dans %s: %s", self.table_name, e)
+            return 0
 
     def update_changelog_line(self, line_id: int, data: Dict[str, Any]) -> None:
         """
         Met à jour une ligne du changelog avec des données traitées.
         """
         if not data:
-            global_logger.warning("Aucune donnée fournie pour la mise à jour de la ligne ID {line_id}.")
+            global_logger.warning("Aucune donnée fournie pour la mise à jour de la ligne ID %s.", line_id)
             return
 
-        conn = self._get_db_connection()
         try:
-            cursor = conn.cursor()
-            set_clauses = [f"{key} = ?" for key in data.keys()]
-            values = list(data.values())
-            values.append(line_id)
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                columns = tuple(sorted(data))
+                cursor.execute(self._update_sql(columns), (*(data[column] for column in columns), line_id))
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de la mise à jour de la ligne ID %s dans %s: %s", line_id, self.table_name, e)
 
+    def _update_sql(self, columns: Tuple[str, ...]) -> str:
+        """
+        Retourne la requête UPDATE d'une ligne pour ce jeu de colonnes, construite une seule fois.
+        Les colonnes sont attendues triées : deux dicts aux clés identiques mais ordonnées différemment
+        partagent ainsi la même requête (et la même requête préparée côté sqlite3).
+        """
+        sql = self._update_sql_by_keys.get(columns)
+        if sql is None:
+            set_clauses = [f"{key} = ?" for key in columns]
             sql = f"UPDATE {self.table_name} SET {', '.join(set_clauses)} WHERE id = ?"
-            cursor.execute(sql, tuple(values))
-            conn.commit()
-        except sqlite3.Error as e:
-            global_logger.error(f"Erreur SQLite lors de la mise à jour de la ligne ID {line_id} dans {self.table_name}: {e}")
-        finally:
-            conn.close()
+            self._update_sql_by_keys[columns] = sql
+        return sql
 
-    def get_lines_to_process(self, limit: Optional[int] = None, random_selection: bool = False) -> List[sqlite3.Row]:
+    def _build_case_update(self, columns: Tuple[str, ...], rows: List[Tuple[int, Tuple[Any, ...]]]) -> Tuple[str, List[Any]]:
         """
-        Récupère les lignes qui ne sont pas encore marquées comme 'is_done' et 'not_supported'.
+        Construit une requête UPDATE unique couvrant plusieurs lignes :
+        `SET col = CASE id WHEN ? THEN ? ... END, ... WHERE id IN (?, ...)`.
+
+        Args:
+            columns (Tuple[str, ...]): Colonnes mises à jour, communes à toutes les lignes.
+            rows (List[Tuple[int, Tuple[Any, ...]]]): Couples (line_id, valeurs dans l'ordre de `columns`).
+
+        Returns:
+            Tuple[str, List[Any]]: La requête SQL et ses paramètres à plat.
+        """
+        when_clauses = " ".join(["WHEN ? THEN ?"] * len(rows))
+        set_clauses = [f"{column} = CASE id {when_clauses} END" for column in columns]
+        placeholders = ", ".join(["?"] * len(rows))
+        sql = f"UPDATE {self.table_name} SET {', '.join(set_clauses)} WHERE id IN ({placeholders})"
+
+        params: List[Any] = []
+        for index in range(len(columns)):
+            for line_id, values in rows:
+                params.extend((line_id, values[index]))
+        params.extend(line_id for line_id, _ in rows)
+        return sql, params
+
+    def update_changelog_lines_bulk(self, updates: Sequence[Tuple[int, Dict[str, Any]]],
+                                    cached_summaries: Sequence[Tuple[str, Dict[str, Any]]] = ()) -> int:
+        """
+        Met à jour plusieurs lignes du changelog en une seule transaction.
+        Les mises à jour portant sur les mêmes colonnes sont fusionnées en une seule requête
+        UPDATE ... CASE id WHEN ..., découpée si elle dépasse la limite de paramètres de SQLite.
+
+        Args:
+            updates (Sequence[Tuple[int, Dict[str, Any]]]): Couples (line_id, données) à appliquer.
+            cached_summaries (Sequence[Tuple[str, Dict[str, Any]]], optional): Couples (clé, réponse IA)
+                écrits dans le cache des résumés au sein de la même transaction (voir save_cached_summary).
+
+        Returns:
+            int: Le nombre de lignes mises à jour.
         """
-        conn = self._get_db_connection()
+        # Par jeu de colonnes (triées : l'ordre des clés des dicts n'a pas d'effet) :
+        # line_id -> valeurs (la dernière mise à jour d'une ligne l'emporte).
+        updates_by_columns: Dict[Tuple[str, ...], Dict[int, Tuple[Any, ...]]] = {}
+        for line_id, data in updates:
+            if not data:
+                global_logger.warning("Aucune donnée fournie pour la mise à jour de la ligne ID %s.", line_id)
+                continue
+            columns = tuple(sorted(data))
+            updates_by_columns.setdefault(columns, {})[line_id] = tuple(data[column] for column in columns)
+
+        if not updates_by_columns and not cached_summaries:
+            return 0
+
         try:
-            cursor = conn.cursor()
-            sql = f"SELECT * FROM {self.table_name} WHERE is_done = FALSE AND not_supported = FALSE"
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                if cached_summaries:
+                    cursor.executemany(self._save_cached_summary_sql,
+                                       [(cache_key, json.dumps(response)) for cache_key, response in cached_summaries])
+                updated_count = 0
+                for columns, values_by_id in updates_by_columns.items():
+                    rows = list(values_by_id.items())
+                    if len(rows) == 1:
+                        line_id, values = rows[0]
+                        cursor.execute(self._update_sql(columns), (*values, line_id))
+                        updated_count += cursor.rowcount
+                        continue
+                    # Chaque ligne consomme 2 paramètres par colonne (WHEN/THEN) + 1 pour le IN.
+                    rows_per_statement = max(1, self._MAX_SQL_VARIABLES // (2 * len(columns) + 1))
+                    for start in range(0, len(rows), rows_per_statement):
+                        sql, params = self._build_case_update(columns, rows[start:start + rows_per_statement])
+                        cursor.execute(sql, params)
+                        updated_count += cursor.rowcount
+                return updated_count
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de la mise à jour groupée dans %s: %s", self.table_name, e)
+            return 0
+
+    def _validated_columns(self, columns: Sequence[str]) -> str:
+        """
+        Vérifie les noms de colonnes (interpolés tels quels dans la requête) et retourne la liste SQL.
+        """
+        unknown_columns = [column for column in columns if column not in self._ALLOWED_COLUMNS]
+        if not columns or unknown_columns:
+            raise ValueError(f"Colonnes invalides pour {self.table_name} : {unknown_columns or 'aucune'}")
+        return ", ".join(columns)
 
-            if random_selection:
-                sql += " ORDER BY RANDOM()"
-            else:
-                sql += " ORDER BY type"
+    def get_lines_to_process(self, limit: Optional[int] = None, random_selection: bool = False,
+                             columns: Sequence[str] = DEFAULT_PENDING_COLUMNS
+                             ) -> Union[List[ChangelogRow], List[sqlite3.Row]]:
+        """
+        Récupère les lignes qui ne sont pas encore marquées comme 'is_done' et 'not_supported'.
+        Une sélection aléatoire bornée par `limit` est tirée par identifiant (voir _sample_pending_lines)
+        plutôt que par ORDER BY RANDOM(), qui trie toute la table.
 
-            if limit is not None:
-                sql += f" LIMIT {int(limit)}"
+        Args:
+            limit (Optional[int]): Nombre maximal de lignes retournées.
+            random_selection (bool): Tirer les lignes au hasard plutôt que par type.
+            columns (Sequence[str]): Colonnes lues. Par défaut (id, line_content, type) : les colonnes
+                                     volumineuses (diff, pr_body...) ne sont pas lues si elles ne servent pas.
 
-            cursor.execute(sql)
-            rows: List[sqlite3.Row] = cursor.fetchall()
+        Returns:
+            Union[List[ChangelogRow], List[sqlite3.Row]]: Des ChangelogRow (tuples nommés, plus légers)
+                pour les colonnes par défaut, des sqlite3.Row pour toute autre sélection de colonnes.
+
+        Raises:
+            ValueError: Si une colonne demandée n'existe pas dans la table.
+        """
+        selected_columns = self._validated_columns(columns)
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                if random_selection and limit is not None:
+                    if 'id' not in columns:
+                        selected_columns = f"id, {selected_columns}"  # Nécessaire au dédoublonnage du tirage
+                    rows = self._sample_pending_lines(cursor, int(limit), selected_columns)
+                else:
+                    sql = self._select_pending_sql(selected_columns, "RANDOM()" if random_selection else "type")
+                    cursor.execute(sql, (int(limit) if limit is not None else -1,))
+                    rows = cursor.fetchall()
+            if tuple(columns) == self.DEFAULT_PENDING_COLUMNS:
+                return [ChangelogRow(*row) for row in rows]
             return rows
         except sqlite3.Error as e:
-            global_logger.error(f"Erreur SQLite lors de la récupération des lignes à traiter de {self.table_name}: {e}")
+            global_logger.error("Erreur SQLite lors de la récupération des lignes à traiter de %s: %s", self.table_name, e)
             return []
-        finally:
-            conn.close()
\ No newline at end of file
+
+    def _select_pending_sql(self, selected_columns: str, order_by: str) -> str:
+        """
+        Retourne le SELECT des lignes à traiter pour ces colonnes et ce tri, construit une seule fois.
+        """
+        cache_key = (selected_columns, order_by)
+        sql = self._select_pending_sql_by_key.get(cache_key)
+        if sql is None:
+            sql = (f"SELECT {selected_columns} FROM {self.table_name} WHERE {self._PENDING_CONDITION}"
+                   f" ORDER BY {order_by} LIMIT ?")
+            self._select_pending_sql_by_key[cache_key] = sql
+        return sql
+
+    def _sample_pending_lines(self, cursor: sqlite3.Cursor, limit: int, selected_columns: str) -> List[sqlite3.Row]:
+        """
+        Tire au hasard jusqu'à `limit` lignes à traiter : des identifiants candidats sont tirés entre
+        le plus petit et le plus grand id à traiter, puis lus par clé primaire. Les ids absents ou déjà
+        traités sont simplement écartés ; après quelques tirages insuffisants, le complément est tiré
+        parmi la liste des ids restants.
+        """
+        if limit <= 0:
+            return []
+        cursor.execute(self._select_pending_bounds_sql)
+        lowest_id, highest_id = cursor.fetchone()
+        if lowest_id is None:
+            return []
+
+        selected: Dict[int, sqlite3.Row] = {}
+        tried_ids: Set[int] = set()
+        id_span = highest_id - lowest_id + 1
+        for _ in range(self._SAMPLE_MAX_ATTEMPTS):
+            untried_count = id_span - len(tried_ids)
+            if len(selected) >= limit or untried_count <= 0:
+                break
+            wanted = min((limit - len(selected)) * 3, untried_count)
+            candidate_ids: List[int] = []
+            while len(candidate_ids) < wanted:
+                candidate_id = random.randint(lowest_id, highest_id)
+                if candidate_id not in tried_ids:
+                    tried_ids.add(candidate_id)
+                    candidate_ids.append(candidate_id)
+            for row in self._fetch_pending_lines_by_ids(cursor, candidate_ids, selected_columns):
+                if len(selected) < limit:
+                    selected[row['id']] = row
+
+        if len(selected) < limit and len(tried_ids) < id_span:
+            # Table très clairsemée : on complète à partir des ids restants (lecture d'index, sans tri).
+            cursor.execute(self._select_pending_ids_sql)
+            remaining_ids = [row['id'] for row in cursor.fetchall() if row['id'] not in selected]
+            extra_ids = random.sample(remaining_ids, min(limit - len(selected), len(remaining_ids)))
+            for row in self._fetch_pending_lines_by_ids(cursor, extra_ids, selected_columns):
+                selected[row['id']] = row
+
+        rows = list(selected.values())
+        random.shuffle(rows)
+        return rows
+
+    def _fetch_pending_lines_by_ids(self, cursor: sqlite3.Cursor, line_ids: Sequence[int],
+                                    selected_columns: str) -> List[sqlite3.Row]:
+        """
+        Lit les lignes à traiter parmi `line_ids`, par paquets respectant la limite de paramètres de SQLite.
+        """
+        rows: List[sqlite3.Row] = []
+        for start in range(0, len(line_ids), self._MAX_SQL_VARIABLES):
+            chunk = line_ids[start:start + self._MAX_SQL_VARIABLES]
+            placeholders = ", ".join(["?"] * len(chunk))
+            cursor.execute(
+                f"SELECT {selected_columns} FROM {self.table_name} WHERE id IN ({placeholders}) AND {self._PENDING_CONDITION}",
+                chunk
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def get_cached_summary(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une réponse IA mise en cache pour la clé donnée.
+
+        Returns:
+            Optional[Dict[str, Any]]: La réponse en cache, ou None si absente.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._select_cached_summary_sql, (cache_key,))
+                row = cursor.fetchone()
+                return json.loads(row['response_json']) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            global_logger.error("Erreur lors de la lecture du cache %s: %s", self.summary_cache_table_name, e)
+            return None
+
+    def save_cached_summary(self, cache_key: str, response: Dict[str, Any]) -> None:
+        """
+        Enregistre (ou remplace) une réponse IA dans le cache.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._save_cached_summary_sql, (cache_key, json.dumps(response)))
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de l'écriture dans le cache %s: %s", self.summary_cache_table_name, e)
+
+    def get_cached_llm_response(self, prompt_hash: str, max_age_seconds: int) -> Optional[Dict[str, Any]]:
+        """
+        Récupère la réponse IA mise en cache pour un prompt, si elle n'a pas expiré.
+
+        Args:
+            prompt_hash (str): Empreinte du prompt (voir LLMCachedClient).
+            max_age_seconds (int): Âge maximal de l'entrée, en secondes.
+
+        Returns:
+            Optional[Dict[str, Any]]: La réponse en cache, ou None si absente ou expirée.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._select_cached_llm_response_sql, (prompt_hash, int(time.time()) - max_age_seconds))
+                row = cursor.fetchone()
+                return json.loads(row['response_json']) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            global_logger.error("Erreur lors de la lecture du cache %s: %s", self.llm_cache_table_name, e)
+            return None
+
+    def save_cached_llm_response(self, prompt_hash: str, response: Dict[str, Any]) -> None:
+        """
+        Enregistre (ou remplace) la réponse IA d'un prompt dans le cache.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    self._save_cached_llm_response_sql,
+                    (prompt_hash, json.dumps(response), response.get('prompt_tokens'),
+                     response.get('completion_tokens'), int(time.time()))
+                )
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de l'écriture dans le cache %s: %s", self.llm_cache_table_name, e)
+
+    def get_cached_http_response(self, cache_key: str) -> Optional[Tuple[Optional[str], Optional[str], Any]]:
+        """
+        Récupère une réponse GitHub mémorisée avec ses validateurs HTTP.
+        L'entrée n'expire pas : elle est revalidée auprès de GitHub à chaque utilisation.
+
+        Args:
+            cache_key (str): Clé de la requête (voir GitHubService._conditional_request).
+
+        Returns:
+            Optional[Tuple[Optional[str], Optional[str], Any]]: (etag, last_modified, valeur), ou None si absente.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._select_cached_http_response_sql, (cache_key,))
+                row = cursor.fetchone()
+                return (row['etag'], row['last_modified'], json.loads(row['value_json'])) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            global_logger.error("Erreur lors de la lecture du cache %s: %s", self.http_cache_table_name, e)
+            return None
+
+    def save_cached_http_response(self, cache_key: str, etag: Optional[str], last_modified: Optional[str],
+                                  value: Any) -> None:
+        """
+        Enregistre (ou remplace) une réponse GitHub et ses validateurs HTTP.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._save_cached_http_response_sql,
+                               (cache_key, etag, last_modified, json.dumps(value), int(time.time())))
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            global_logger.error("Erreur lors de l'écriture dans le cache %s: %s", self.http_cache_table_name, e)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """
+        Lit une métadonnée (table partagée entre les versions).
+
+        Returns:
+            Optional[str]: La valeur, ou None si la clé est absente.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                row = conn.execute(self._select_meta_sql, (key,)).fetchone()
+                return row['meta_value'] if row else None
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de la lecture de %s dans %s: %s", key, self.meta_table_name, e)
+            return None
+
+    def set_meta(self, values: Dict[str, Optional[str]]) -> None:
+        """
+        Enregistre (ou remplace) des métadonnées, toutes dans la même transaction :
+        des valeurs liées (ex: un ETag et le contenu correspondant) ne peuvent pas être désynchronisées.
+        """
+        try:
+            with self._lock, self._connection as conn:
+                conn.executemany(self._save_meta_sql, values.items())
+        except sqlite3.Error as e:
+            global_logger.error("Erreur SQLite lors de l'écriture dans %s: %s", self.meta_table_name, e)
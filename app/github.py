@@ -1,20 +1,110 @@
 # app/github.py
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
-from typing import Optional, List, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from app.db_handler import DbHandler
 from app.logger import global_logger
+from app.lru_cache import LRUCache
+
+try:
+    import orjson  # (Dé)codage JSON nettement plus rapide (voir requirements.txt), facultatif
+except ImportError:
+    orjson = None
+
+
+class _NotFound:
+    """
+    Sentinelle renvoyée quand la ressource demandée n'existe pas (HTTP 404).
+    Elle est fausse en contexte booléen, comme None : seuls les appelants qui veulent
+    distinguer « inexistant » d'une erreur passagère ont besoin de la tester.
+    """
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "NOT_FOUND"
+
+
+NOT_FOUND = _NotFound()
+
+
+def _parse_json(response: requests.Response) -> Any:
+    """
+    Décode le corps JSON d'une réponse, avec orjson s'il est installé (sinon json de la bibliothèque standard).
+    Lève ValueError si le corps n'est pas du JSON valide, dans les deux cas.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _dump_json(payload: Any) -> bytes:
+    """
+    Encode un corps de requête JSON (UTF-8), avec orjson s'il est installé.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+# Début du patch d'un fichier dans un diff unifié de PR.
+_DIFF_FILE_HEADER_RE = re.compile(r"^diff --git ", re.MULTILINE)
+
+
+class _ConditionalEntry(NamedTuple):
+    """
+    Réponse mémorisée avec ses validateurs HTTP, pour la revalider par une requête conditionnelle.
+    """
+    etag: Optional[str]
+    last_modified: Optional[str]
+    value: Any
+
 
 class GitHubService:
     """
     Gère la communication avec l'API GitHub pour récupérer des informations sur les PRs et les fichiers.
     """
     BASE_API_URL = "https://api.github.com"
+    GRAPHQL_API_URL = "https://api.github.com/graphql"
+    SEARCH_RESULTS_LIMIT = 50
+    GRAPHQL_PR_BATCH_SIZE = 50  # PRs demandées par requête GraphQL (un alias chacune)
+    _SEARCH_PRS_QUERY = """
+    query($q: String!, $first: Int!) {
+      search(query: $q, type: ISSUE, first: $first) {
+        nodes {
+          ... on PullRequest { number title body url }
+        }
+      }
+    }
+    """
+    # Requêtes API simultanées : au-delà, GitHub applique ses limites secondaires.
+    MAX_CONCURRENT_REQUESTS = int(os.getenv("GITHUB_CONCURRENCY", "4"))
+    CONDITIONAL_CACHE_SIZE = 1000  # Réponses mémorisées avec leur ETag / Last-Modified
+    HTTP_POOL_SIZE = 16  # Connexions keep-alive conservées par hôte
+    RATE_LIMIT_LOW_WATERMARK = 50  # En dessous de ce quota restant, les requêtes sont espacées
+    RATE_LIMIT_BACKOFF_SECONDS = 1.0
+    RATE_LIMIT_REQUESTS_PER_SLOT = 100  # Quota restant requis par requête simultanée autorisée
+    RATE_LIMIT_MAX_WAIT_SECONDS = 60  # Attente maximale avant de retenter une requête limitée
+    RAW_FILE_CHUNK_SIZE = 65536
+    MAX_RAW_FILE_BYTES = 10 * 1024 * 1024  # Au-delà, le téléchargement d'un fichier brut est abandonné
 
-    def __init__(self, github_token: str) -> None:
+    def __init__(self, github_token: str, response_store: Optional[DbHandler] = None) -> None:
         """
         Initialise le service GitHub avec un token d'accès.
 
         Args:
             github_token (str): Token d'accès GitHub.
+            response_store (Optional[DbHandler], optional): Base où conserver, d'une exécution à l'autre,
+                les réponses revalidées par ETag / Last-Modified. Par défaut, elles restent en mémoire.
         """
         if not github_token:
             raise ValueError("Le token GitHub ne peut pas être vide.")
@@ -25,91 +115,633 @@ class GitHubService:
             'Authorization': f'token {self._github_token}',
             'Accept': 'application/vnd.github.v3+json'
         }
+        # Requêtes dont le corps JSON est encodé par _dump_json (GraphQL).
+        self._headers_json_body = {**self._headers, 'Content-Type': 'application/json'}
         self._headers_diff: Dict[str, str] = {
             'Authorization': f'token {self._github_token}',
             'Accept': 'application/vnd.github.v3.diff'
         }
+        # Le service peut être partagé entre plusieurs threads : on borne les requêtes simultanées.
+        self._request_semaphore = threading.BoundedSemaphore(self.MAX_CONCURRENT_REQUESTS)
+        # (url, Accept, paramètres, variante) -> _ConditionalEntry
+        self._conditional_cache = LRUCache(self.CONDITIONAL_CACHE_SIZE)
+        self._response_store = response_store
+        self._session = self._create_session()
+        # Dernier quota annoncé par GitHub pour chaque ressource (X-RateLimit-Resource : 'core', 'search',
+        # 'graphql'... ont des quotas distincts) : ressource -> (X-RateLimit-Remaining, X-RateLimit-Reset
+        # en timestamp Unix). Une ressource est absente tant que son quota est inconnu.
+        self._rate_limits: Dict[str, Tuple[int, float]] = {}
+
+    def set_response_store(self, response_store: Optional[DbHandler]) -> None:
+        """
+        Change la base où sont conservées les réponses revalidées (ex: à chaque version traitée) ;
+        None les garde uniquement en mémoire.
+        """
+        self._response_store = response_store
+
+    def _create_session(self) -> requests.Session:
+        """
+        Crée la session HTTP partagée : connexions TCP/TLS réutilisées d'une requête à l'autre,
+        et nouvelles tentatives automatiques (avec délai croissant) sur les erreurs 502/503/504.
+        """
+        session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.HTTP_POOL_SIZE, pool_maxsize=self.HTTP_POOL_SIZE,
+                              max_retries=retry)
+        session.mount("https://", adapter)
+        return session
+
+    def rate_limit_exhausted_until(self, resource: str = 'core') -> Optional[float]:
+        """
+        Indique si le quota GitHub d'une ressource est épuisé pour plus longtemps que l'attente tolérée
+        (RATE_LIMIT_MAX_WAIT_SECONDS) : continuer ne ferait qu'échouer d'ici sa réinitialisation.
+
+        Args:
+            resource (str, optional): Ressource de quota ('core' pour l'API REST, 'search', 'graphql').
+
+        Returns:
+            Optional[float]: Le timestamp Unix de réinitialisation du quota dans ce cas, None sinon.
+        """
+        remaining, reset_at = self._rate_limits.get(resource, (None, None))
+        if remaining is not None and remaining <= 0 and reset_at - time.time() > self.RATE_LIMIT_MAX_WAIT_SECONDS:
+            return reset_at
+        return None
+
+    def _rate_limit_exhausted(self, resource: str, url: str) -> bool:
+        """
+        Indique qu'une requête sur cette ressource échouerait d'ici la réinitialisation de son quota :
+        elle est alors abandonnée plutôt que d'attendre (voir rate_limit_exhausted_until).
+        """
+        reset_at = self.rate_limit_exhausted_until(resource)
+        if reset_at is None:
+            return False
+        global_logger.debug("⏸️ Quota d'API GitHub (%s) épuisé jusqu'à %s, requête abandonnée : %s",
+                            resource, time.strftime('%H:%M:%S', time.localtime(reset_at)), url)
+        return True
+
+    def _rate_limit_resource(self, url: str) -> str:
+        """
+        Ressource de quota décomptée par une requête REST : l'API de recherche a son propre quota.
+        """
+        return 'search' if url.startswith(f"{self.BASE_API_URL}/search/") else 'core'
+
+    def _wait_if_rate_limit_low(self, resource: str) -> None:
+        """
+        Attend la réinitialisation du quota de la ressource s'il est épuisé,
+        et espace simplement les requêtes s'il est bas.
+        """
+        remaining, reset_at = self._rate_limits.get(resource, (None, None))
+        if remaining is None:
+            return
+        if remaining <= 0:
+            wait = min(reset_at - time.time(), self.RATE_LIMIT_MAX_WAIT_SECONDS)
+            if wait > 0:
+                global_logger.warning("⏳ Quota d'API GitHub (%s) épuisé, attente de %.0f s avant la requête suivante.",
+                                      resource, wait)
+                time.sleep(wait)
+        elif remaining < self.RATE_LIMIT_LOW_WATERMARK:
+            global_logger.debug("⏳ Quota d'API GitHub (%s) bas (%s restantes), requête différée.", resource, remaining)
+            time.sleep(self.RATE_LIMIT_BACKOFF_SECONDS)
+
+    def _record_rate_limit(self, response: requests.Response, resource: str) -> None:
+        """
+        Mémorise le quota annoncé par une réponse, pour la ressource qu'elle indique (à défaut, celle demandée).
+        """
+        headers = response.headers
+        if 'X-RateLimit-Remaining' in headers and 'X-RateLimit-Reset' in headers:
+            resource = headers.get('X-RateLimit-Resource', resource)
+            self._rate_limits[resource] = (int(headers['X-RateLimit-Remaining']), float(headers['X-RateLimit-Reset']))
+
+    def _rate_limit_retry_delay(self, response: requests.Response) -> Optional[float]:
+        """
+        Délai à respecter avant de retenter une requête refusée (403 / 429) pour cause de limite de débit,
+        d'après Retry-After ou X-RateLimit-Reset, plafonné à RATE_LIMIT_MAX_WAIT_SECONDS.
+        Retourne None si le refus n'est pas dû à la limite de débit (ex: droits insuffisants).
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return min(max(float(retry_after), 0.0), self.RATE_LIMIT_MAX_WAIT_SECONDS)
+            except ValueError:
+                return self.RATE_LIMIT_BACKOFF_SECONDS
+        if response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+            wait = float(response.headers['X-RateLimit-Reset']) - time.time()
+            return min(max(wait, 0.0), self.RATE_LIMIT_MAX_WAIT_SECONDS)
+        if response.status_code == 429:
+            return self.RATE_LIMIT_BACKOFF_SECONDS
+        return None
+
+    def get_rate_limit(self) -> Optional[Dict[str, Any]]:
+        """
+        Interroge GET /rate_limit (non décompté du quota) et mémorise le quota restant de chaque ressource.
+
+        Returns:
+            Optional[Dict[str, Any]]: Le quota REST ('limit', 'remaining', 'reset', ...), ou None en cas d'erreur.
+        """
+        response = self._make_api_request(f"{self.BASE_API_URL}/rate_limit", wait_on_rate_limit=False)
+        if not response:
+            return None
+        try:
+            resources = _parse_json(response).get('resources') or {}
+        except ValueError:
+            global_logger.error("❌ Erreur de décodage JSON de la réponse /rate_limit.")
+            return None
+        for resource, quota in resources.items():
+            self._rate_limits[resource] = (int(quota['remaining']), float(quota['reset']))
+        return resources.get('core')
+
+    def tune_concurrency_to_rate_limit(self) -> int:
+        """
+        Consulte le quota au démarrage et réduit les requêtes simultanées s'il est bas :
+        un créneau pour RATE_LIMIT_REQUESTS_PER_SLOT requêtes restantes, dans la limite de
+        MAX_CONCURRENT_REQUESTS. À appeler avant toute requête concurrente.
+
+        Returns:
+            int: Le nombre de requêtes simultanées retenu.
+        """
+        core = self.get_rate_limit()
+        if core is None:
+            global_logger.warning("⚠️ Quota d'API GitHub inconnu, %s requête(s) simultanée(s) conservée(s).",
+                                  self.MAX_CONCURRENT_REQUESTS)
+            return self.MAX_CONCURRENT_REQUESTS
+
+        concurrency = max(1, min(self.MAX_CONCURRENT_REQUESTS,
+                                 int(core['remaining']) // self.RATE_LIMIT_REQUESTS_PER_SLOT))
+        global_logger.info("ℹ️ Quota d'API GitHub : %s/%s requête(s) restante(s), réinitialisation à %s.",
+                           core['remaining'], core.get('limit'),
+                           time.strftime('%H:%M:%S', time.localtime(float(core['reset']))))
+        if concurrency < self.MAX_CONCURRENT_REQUESTS:
+            global_logger.warning("⚠️ Quota d'API GitHub bas : requêtes simultanées ramenées de %s à %s.",
+                                  self.MAX_CONCURRENT_REQUESTS, concurrency)
+            self.MAX_CONCURRENT_REQUESTS = concurrency
+            self._request_semaphore = threading.BoundedSemaphore(concurrency)
+        return concurrency
 
     def _make_api_request(self, url: str, custom_headers: Optional[Dict[str, str]] = None,
-                          params: Optional[Dict[str, Any]] = None) -> Optional[requests.Response]:
-        """Méthode utilitaire pour faire des requêtes API et gérer les erreurs communes."""
+                          params: Optional[Dict[str, Any]] = None, stream: bool = False,
+                          wait_on_rate_limit: bool = True) -> Optional[requests.Response]:
+        """
+        Méthode utilitaire pour faire des requêtes API et gérer les erreurs communes.
+        Retourne NOT_FOUND (faux en contexte booléen) si la ressource n'existe pas.
+        Une requête refusée pour limite de débit (403 / 429) est retentée une fois après l'attente
+        indiquée par GitHub, sauf si wait_on_rate_limit est faux.
+        Si le quota de la ressource est épuisé pour plus de RATE_LIMIT_MAX_WAIT_SECONDS
+        (voir rate_limit_exhausted_until), None est retourné aussitôt, sans attente ni nouvelle tentative.
+        """
         headers_to_use = custom_headers if custom_headers is not None else self._headers
-        try:
-            response = requests.get(url, headers=headers_to_use, params=params, timeout=20)
-            response.raise_for_status()
-            if 'X-RateLimit-Remaining' in response.headers and int(response.headers['X-RateLimit-Remaining']) == 0:
-                global_logger.warning("⚠️ Attention : Limite de taux d'API GitHub atteinte.")
+        resource = self._rate_limit_resource(url)
+        for attempt in range(2):
+            if wait_on_rate_limit and self._rate_limit_exhausted(resource, url):
                 return None
-            if response.status_code == 204:
+            if attempt == 0:
+                # La nouvelle tentative suit l'attente indiquée par GitHub : elle n'attend pas une seconde fois.
+                self._wait_if_rate_limit_low(resource)
+            try:
+                with self._request_semaphore:
+                    response = self._session.get(url, headers=headers_to_use, params=params, timeout=20, stream=stream)
+                self._record_rate_limit(response, resource)
+                if response.status_code in (403, 429) and wait_on_rate_limit and attempt == 0:
+                    if self._rate_limit_exhausted(resource, url):
+                        response.close()
+                        return None
+                    retry_delay = self._rate_limit_retry_delay(response)
+                    if retry_delay is not None:
+                        global_logger.warning(
+                            "⏳ Limite de taux d'API GitHub atteinte (HTTP %s), nouvelle tentative dans %.0f s.",
+                            response.status_code, retry_delay)
+                        response.close()
+                        time.sleep(retry_delay)
+                        continue
+                response.raise_for_status()
+                if self._rate_limits.get(resource, (None, None))[0] == 0:
+                    global_logger.warning("⚠️ Attention : Limite de taux d'API GitHub (%s) atteinte.", resource)
+                if response.status_code == 204:
+                    return None
+                return response
+            except requests.exceptions.HTTPError as http_err:
+                status_code = getattr(http_err.response, 'status_code', None)
+                if status_code == 404:
+                    global_logger.warning("⚠️ Ressource introuvable (HTTP 404) : %s", url)
+                    return NOT_FOUND
+                global_logger.error("❌ Erreur HTTP %s lors de la requête API (%s) : %s", status_code, url, http_err)
                 return None
-            return response
-        except requests.exceptions.HTTPError as http_err:
-            status_code = getattr(http_err.response, 'status_code', None)
-            global_logger.error(f"❌ Erreur HTTP {status_code} lors de la requête API ({url}) : {http_err}")
+            except requests.exceptions.RequestException as err:
+                global_logger.error("❌ Erreur de requête API (%s) : %s", url, err)
+                return None
+        return None
+
+    def _graphql(self, query: str, variables: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Exécute une requête sur l'API GraphQL de GitHub.
+
+        Returns:
+            Optional[Dict[str, Any]]: Le champ 'data' de la réponse, ou None en cas d'erreur
+                                      (HTTP, JSON invalide ou erreurs GraphQL).
+        """
+        payload = self._graphql_payload(query, variables)
+        if payload is None:
             return None
+        if payload.get('errors'):
+            messages = "; ".join(error.get('message', '?') for error in payload['errors'])
+            global_logger.error("❌ Erreur(s) GraphQL : %s", messages)
+            return None
+        return payload.get('data')
+
+    def _graphql_payload(self, query: str, variables: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Envoie une requête GraphQL et retourne la réponse complète ('data' et 'errors'), pour les appelants
+        qui savent exploiter un résultat partiel. Retourne None en cas d'erreur HTTP ou de JSON invalide,
+        ou aussitôt si le quota GraphQL est épuisé (voir rate_limit_exhausted_until).
+        """
+        if self._rate_limit_exhausted('graphql', self.GRAPHQL_API_URL):
+            return None
+        self._wait_if_rate_limit_low('graphql')
+        try:
+            with self._request_semaphore:
+                response = self._session.post(self.GRAPHQL_API_URL, headers=self._headers_json_body,
+                                              data=_dump_json({'query': query, 'variables': variables}),
+                                              timeout=20)
+            self._record_rate_limit(response, 'graphql')
+            response.raise_for_status()
+            return _parse_json(response)
         except requests.exceptions.RequestException as err:
-            global_logger.error(f"❌ Erreur de requête API ({url}) : {err}")
+            global_logger.error("❌ Erreur de requête GraphQL : %s", err)
+            return None
+        except ValueError:
+            global_logger.error("❌ Erreur de décodage JSON de la réponse GraphQL.")
             return None
 
+    def _conditional_request(self, url: str, read: Callable[[requests.Response], Any],
+                             custom_headers: Optional[Dict[str, str]] = None,
+                             params: Optional[Dict[str, Any]] = None, stream: bool = False,
+                             variant: Any = None) -> Any:
+        """
+        Requête GET revalidée par ETag / Last-Modified : si une réponse précédente est en cache, elle est
+        redemandée avec If-None-Match / If-Modified-Since, et un 304 (non décompté du quota GitHub)
+        renvoie directement la valeur mémorisée.
+
+        Args:
+            url (str): URL de la requête.
+            read (Callable[[requests.Response], Any]): Transforme la réponse en valeur retournée (et mémorisée).
+            custom_headers, params, stream: Comme pour _make_api_request.
+            variant (Any, optional): Distingue des lectures différentes d'une même ressource (ex: diff tronqué).
+
+        Returns:
+            Any: La valeur lue, NOT_FOUND si la ressource n'existe pas, None en cas d'erreur.
+        """
+        headers = custom_headers if custom_headers is not None else self._headers
+        cache_key = (url, headers.get('Accept'), tuple(sorted((params or {}).items())), variant)
+        found, entry = self._conditional_cache.lookup(cache_key)
+        store_key = None
+        if self._response_store is not None:
+            store_key = json.dumps(cache_key, default=str)
+            if not found:
+                stored = self._response_store.get_cached_http_response(store_key)
+                if stored is not None:
+                    found, entry = True, _ConditionalEntry(*stored)
+                    self._conditional_cache.store(cache_key, entry)
+        if found:
+            headers = dict(headers)
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            else:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self._make_api_request(url, custom_headers=headers, params=params, stream=stream)
+        if not response:
+            return response
+        if found and response.status_code == 304:
+            response.close()
+            global_logger.debug("♻️ Réponse inchangée (HTTP 304), valeur en cache réutilisée : %s", url)
+            return entry.value
+
+        value = read(response)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self._conditional_cache.store(cache_key, _ConditionalEntry(etag, last_modified, value))
+            if store_key is not None:
+                self._response_store.save_cached_http_response(store_key, etag, last_modified, value)
+        return value
+
     def search_prs_by_text(self, search_query: str, only_merged: bool = True) -> Optional[List[Dict[str, Any]]]:
         """
         Recherche des PRs basées sur une requête textuelle.
+        La recherche passe par GraphQL, qui renvoie en un seul appel le titre, la description et le lien
+        de chaque PR trouvée (mêmes clés que l'API REST : number, title, body, html_url) ; l'API REST
+        de recherche ne sert plus qu'en secours.
         """
         query = f'repo:{self.owner}/{self.repo} is:pr "{search_query}"'
         if only_merged:
             query += " is:merged"
 
+        global_logger.info("ℹ️ Recherche de PRs avec la requête : %s", query)
+        data = self._graphql(self._SEARCH_PRS_QUERY,
+                             {'q': f"{query} sort:updated-desc", 'first': self.SEARCH_RESULTS_LIMIT})
+        if data is None:
+            global_logger.warning("⚠️ Recherche GraphQL indisponible, repli sur l'API REST.")
+            return self._search_prs_by_text_rest(query, search_query)
+
+        nodes = (data.get('search') or {}).get('nodes') or []
+        # Les résultats qui ne sont pas des PRs arrivent sous forme de nœuds vides.
+        found_prs = [
+            {'number': node['number'], 'title': node.get('title'), 'body': node.get('body'),
+             'html_url': node.get('url')}
+            for node in nodes if node and node.get('number')
+        ]
+        global_logger.info("✅ %s PR(s) trouvée(s).", len(found_prs))
+        return found_prs
+
+    def _search_prs_by_text_rest(self, query: str, search_query: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Recherche de PRs par l'API REST (search/issues).
+        """
         url = f"{self.BASE_API_URL}/search/issues"
         params = {'q': query, 'sort': 'updated', 'order': 'desc'}
+        try:
+            data = self._conditional_request(url, _parse_json, params=params)
+        except ValueError:
+            global_logger.error("❌ Erreur de décodage JSON pour la recherche : '%s'", search_query)
+            return None
 
-        global_logger.info(f"ℹ️ Recherche de PRs avec la requête : {query}")
-        response = self._make_api_request(url, params=params)
-
-        if response:
-            try:
-                data = response.json()
-                if 'items' in data:
-                    global_logger.info(f"✅ {data.get('total_count', 0)} PR(s) trouvée(s).")
-                    return data['items']
-                return []
-            except ValueError:
-                global_logger.error(f"❌ Erreur de décodage JSON pour la recherche : '{search_query}'")
-                return None
+        if data:
+            if 'items' in data:
+                global_logger.info("✅ %s PR(s) trouvée(s).", data.get('total_count', 0))
+                return data['items']
+            return []
         return None
 
     def get_pr_details(self, pr_number: int) -> Optional[Dict[str, Any]]:
         """
         Récupère les détails d'une Pull Request spécifique.
+        Retourne NOT_FOUND si la PR n'existe pas, None en cas d'erreur passagère.
         """
         url = f"{self.BASE_API_URL}/repos/{self.owner}/{self.repo}/pulls/{pr_number}"
-        global_logger.info(f"ℹ️ Récupération des détails pour la PR #{pr_number}")
-        response = self._make_api_request(url)
-        return response.json() if response else None
+        global_logger.info("ℹ️ Récupération des détails pour la PR #%s", pr_number)
+        return self._conditional_request(url, _parse_json)
+
+    def fetch_prs_graphql(self, pr_numbers: Iterable[int]) -> Dict[int, Any]:
+        """
+        Récupère les détails de plusieurs PRs par GraphQL : une requête pour GRAPHQL_PR_BATCH_SIZE PRs
+        (un alias `pr_<numéro>: pullRequest(...)` par PR) au lieu d'un appel REST par PR.
+        Les détails reprennent les clés de l'API REST utilisées par les appelants : number, title, body, html_url.
+
+        Args:
+            pr_numbers (Iterable[int]): Numéros des PRs (les doublons ne sont demandés qu'une fois).
+
+        Returns:
+            Dict[int, Any]: numéro -> détails, ou NOT_FOUND si la PR n'existe pas. Les PRs dont la
+                            récupération a échoué pour une autre raison sont absentes du résultat.
+        """
+        unique_numbers = list(dict.fromkeys(int(pr_number) for pr_number in pr_numbers))
+        results: Dict[int, Any] = {}
+        for start in range(0, len(unique_numbers), self.GRAPHQL_PR_BATCH_SIZE):
+            batch = unique_numbers[start:start + self.GRAPHQL_PR_BATCH_SIZE]
+            aliases = " ".join(
+                f"pr_{pr_number}: pullRequest(number: {pr_number}) {{ number title body url }}"
+                for pr_number in batch
+            )
+            query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+            global_logger.info("ℹ️ Récupération GraphQL des détails de %s PR(s)", len(batch))
+            payload = self._graphql_payload(query, {'owner': self.owner, 'name': self.repo})
+            if payload is None:
+                continue
+
+            # Une PR inexistante donne un nœud nul accompagné d'une erreur NOT_FOUND à son chemin.
+            missing_aliases = {
+                error['path'][-1] for error in payload.get('errors') or []
+                if error.get('type') == 'NOT_FOUND' and error.get('path')
+            }
+            repository = (payload.get('data') or {}).get('repository') or {}
+            for pr_number in batch:
+                alias = f"pr_{pr_number}"
+                node = repository.get(alias)
+                if node:
+                    results[pr_number] = {'number': node.get('number'), 'title': node.get('title'),
+                                          'body': node.get('body'), 'html_url': node.get('url')}
+                elif alias in missing_aliases:
+                    results[pr_number] = NOT_FOUND
+        return results
+
+    def get_pr_details_bulk(self, pr_numbers: Iterable[int]) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        Récupère les détails de plusieurs PRs en parallèle, sur les connexions de la session.
+        Les résultats sont produits au fur et à mesure de leur arrivée, pas dans l'ordre demandé.
+
+        Args:
+            pr_numbers (Iterable[int]): Numéros des PRs (les doublons ne sont demandés qu'une fois).
+
+        Yields:
+            Tuple[int, Optional[Dict[str, Any]]]: (numéro, détails) ; les détails valent NOT_FOUND
+                                                  ou None comme pour get_pr_details.
+        """
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENT_REQUESTS, thread_name_prefix="github") as executor:
+            futures = {executor.submit(self.get_pr_details, pr_number): pr_number
+                       for pr_number in dict.fromkeys(pr_numbers)}
+            for future in as_completed(futures):
+                pr_number = futures[future]
+                try:
+                    yield pr_number, future.result()
+                except ValueError:
+                    global_logger.error("❌ Erreur de décodage JSON des détails de la PR #%s", pr_number)
+                    yield pr_number, None
 
-    def get_pr_diff(self, pr_number: int) -> Optional[str]:
+    def get_pr_diff(self, pr_number: int, max_chars: Optional[int] = None) -> Optional[str]:
         """
         Récupère le diff d'une Pull Request spécifique.
+
+        Args:
+            pr_number (int): Numéro de la PR.
+            max_chars (Optional[int]): Si fourni, le diff est lu en flux et le téléchargement
+                                       s'arrête dès que ce nombre de caractères est atteint.
+        """
+        url = f"{self.BASE_API_URL}/repos/{self.owner}/{self.repo}/pulls/{pr_number}"
+        global_logger.info("ℹ️ Récupération du diff pour la PR #%s", pr_number)
+        if max_chars is None:
+            diff = self._conditional_request(url, lambda response: response.text, custom_headers=self._headers_diff)
+        else:
+            diff = self._conditional_request(url, lambda response: self._read_text_capped(response, max_chars),
+                                             custom_headers=self._headers_diff, stream=True, variant=max_chars)
+        return None if diff is NOT_FOUND else diff
+
+    def get_pr_diff_hunks(self, pr_number: int) -> Iterator[str]:
+        """
+        Produit le diff d'une PR fichier par fichier (chaque élément commence par 'diff --git ').
+        Le diff est lu en flux : un consommateur qui s'arrête après les premiers fichiers
+        interrompt le téléchargement du reste.
+
+        Args:
+            pr_number (int): Numéro de la PR.
+
+        Yields:
+            str: Le patch complet d'un fichier. Rien n'est produit si le diff est introuvable.
         """
         url = f"{self.BASE_API_URL}/repos/{self.owner}/{self.repo}/pulls/{pr_number}"
-        global_logger.info(f"ℹ️ Récupération du diff pour la PR #{pr_number}")
-        response = self._make_api_request(url, custom_headers=self._headers_diff)
-        return response.text if response else None
+        global_logger.info("ℹ️ Récupération du diff (par fichier) pour la PR #%s", pr_number)
+        response = self._make_api_request(url, custom_headers=self._headers_diff, stream=True)
+        if not response:
+            return
+
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        header_length = len("diff --git ")
+        pending = ""
+        search_from = 1  # L'en-tête en position 0 ouvre le premier fichier, il ne le clôt pas.
+        try:
+            for chunk in response.iter_content(chunk_size=8192):
+                pending += decoder.decode(chunk)
+                file_start = 0
+                for header_match in _DIFF_FILE_HEADER_RE.finditer(pending, search_from):
+                    yield pending[file_start:header_match.start()]
+                    file_start = header_match.start()
+                pending = pending[file_start:]
+                # Un en-tête coupé entre deux blocs est recherché à nouveau au bloc suivant.
+                search_from = max(1, len(pending) - header_length)
+            pending += decoder.decode(b'', final=True)
+            if pending:
+                yield pending
+        finally:
+            response.close()
+
+    @staticmethod
+    def _read_text_capped(response: requests.Response, max_chars: int) -> str:
+        """
+        Lit le corps d'une réponse en flux jusqu'à max_chars caractères puis ferme la connexion,
+        sans télécharger le reste du contenu.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        chunks: List[str] = []
+        length = 0
+        try:
+            for chunk in response.iter_content(chunk_size=8192):
+                text = decoder.decode(chunk)
+                chunks.append(text)
+                length += len(text)
+                if length >= max_chars:
+                    break
+            else:
+                chunks.append(decoder.decode(b'', final=True))
+        finally:
+            response.close()
+        return ''.join(chunks)[:max_chars]
+
+    def stream_raw_file_lines(self, owner: str, repo: str, branch: str,
+                              filepath: str) -> Optional[Generator[str, None, None]]:
+        """
+        Ouvre le téléchargement d'un fichier brut depuis GitHub et en retourne les lignes au fil de l'eau,
+        sans accumuler le fichier : un lecteur qui s'arrête tôt (ex: section trouvée) interrompt
+        le téléchargement. La requête est envoyée dès l'appel, pour signaler une erreur immédiatement.
+
+        Avec une base de réponses (response_store) où fetch_raw_file_content a conservé le fichier,
+        la requête est conditionnelle (If-None-Match) : un 304 renvoie les lignes du contenu conservé.
+        Sinon, le fichier est lu en flux et n'est pas conservé, sa lecture pouvant s'arrêter avant la fin.
+
+        Returns:
+            Optional[Generator[str, None, None]]: Les lignes du fichier (sans saut de ligne), ou None en cas d'erreur.
+                Une interruption en cours de lecture lève requests.exceptions.RequestException depuis le générateur.
+        """
+        if not all([owner, repo, branch, filepath]):
+            global_logger.error("❌ Tous les paramètres sont requis pour stream_raw_file_lines.")
+            return None
+
+        url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{filepath}"
+        global_logger.info("ℹ️  Téléchargement en flux du fichier depuis : %s", url)
+        etag_key, content_key = self._raw_file_meta_keys(url)
+        headers = {'Accept-Encoding': 'gzip'}
+        cached_etag = self._response_store.get_meta(etag_key) if self._response_store is not None else None
+        if cached_etag:
+            headers['If-None-Match'] = cached_etag
+        try:
+            response = self._session.get(url, headers=headers, timeout=20, stream=True)
+            if cached_etag and response.status_code == 304:
+                response.close()
+                cached_content = self._response_store.get_meta(content_key)
+                if cached_content is not None:
+                    global_logger.info("✅ Fichier inchangé (HTTP 304), contenu conservé réutilisé.")
+                    return (line for line in cached_content.splitlines())
+                # ETag sans contenu associé : on retélécharge sans condition.
+                headers.pop('If-None-Match')
+                response = self._session.get(url, headers=headers, timeout=20, stream=True)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as err:
+            global_logger.error("❌ Erreur lors du téléchargement du fichier %s: %s", filepath, err)
+            return None
+        return self._iter_response_lines(response, filepath)
+
+    def _iter_response_lines(self, response: requests.Response, filepath: str) -> Generator[str, None, None]:
+        """
+        Décode et découpe en lignes le corps d'une réponse lue en flux, puis ferme la réponse
+        (y compris si le lecteur s'arrête avant la fin).
+
+        Raises:
+            requests.exceptions.RequestException: Si la connexion est interrompue en cours de lecture :
+                un fichier tronqué ne doit pas passer pour un fichier complet.
+        """
+        response.encoding = 'utf-8'
+        try:
+            for line in response.iter_lines(chunk_size=self.RAW_FILE_CHUNK_SIZE, decode_unicode=True):
+                yield line
+        except requests.exceptions.RequestException as err:
+            global_logger.error("❌ Téléchargement du fichier %s interrompu : %s", filepath, err)
+            raise
+        finally:
+            response.close()
+
+    @staticmethod
+    def _raw_file_meta_keys(url: str) -> Tuple[str, str]:
+        """
+        Clés de la table meta où sont conservés l'ETag et le contenu d'un fichier brut.
+        """
+        return f"raw_file_etag:{url}", f"raw_file_content:{url}"
 
     def fetch_raw_file_content(self, owner: str, repo: str, branch: str, filepath: str) -> Optional[str]:
         """
         Télécharge le contenu brut d'un fichier depuis GitHub.
+        Avec une base de réponses (response_store), le contenu est conservé avec son ETag et la requête
+        suivante est conditionnelle (If-None-Match) : un 304 renvoie le contenu conservé.
         """
         if not all([owner, repo, branch, filepath]):
             global_logger.error("❌ Tous les paramètres sont requis pour fetch_raw_file_content.")
             return None
 
         url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{filepath}"
-        global_logger.info(f"ℹ️  Téléchargement du fichier depuis : {url}")
+        global_logger.info("ℹ️  Téléchargement du fichier depuis : %s", url)
+        etag_key, content_key = self._raw_file_meta_keys(url)
+        headers = {'Accept-Encoding': 'gzip'}
+        cached_etag = self._response_store.get_meta(etag_key) if self._response_store is not None else None
+        if cached_etag:
+            headers['If-None-Match'] = cached_etag
         try:
-            response = requests.get(url, timeout=20)
-            response.raise_for_status()
+            # Lecture en flux, compressée sur le réseau : seul le contenu (décompressé) est accumulé,
+            # puis décodé une seule fois.
+            response = self._session.get(url, headers=headers, timeout=20, stream=True)
+            try:
+                if cached_etag and response.status_code == 304:
+                    cached_content = self._response_store.get_meta(content_key)
+                    if cached_content is not None:
+                        global_logger.info("✅ Fichier inchangé (HTTP 304), contenu conservé réutilisé.")
+                        return cached_content
+                    # ETag sans contenu associé : on retélécharge sans condition.
+                    response.close()
+                    headers.pop('If-None-Match')
+                    cached_etag = None
+                    response = self._session.get(url, headers=headers, timeout=20, stream=True)
+                response.raise_for_status()
+                content = bytearray()
+                for chunk in response.iter_content(chunk_size=self.RAW_FILE_CHUNK_SIZE):
+                    content += chunk
+                    if len(content) > self.MAX_RAW_FILE_BYTES:
+                        global_logger.error(
+                            "❌ Fichier %s trop volumineux (plus de %s octets), téléchargement interrompu.",
+                            filepath, self.MAX_RAW_FILE_BYTES)
+                        return None
+            finally:
+                response.close()
             global_logger.info("✅ Fichier téléchargé avec succès.")
-            return response.text
+            text = content.decode('utf-8', errors='replace')
+            etag = response.headers.get('ETag')
+            if self._response_store is not None and etag:
+                self._response_store.set_meta({content_key: text, etag_key: etag})
+            return text
         except requests.exceptions.RequestException as err:
-            global_logger.error(f"❌ Erreur lors du téléchargement du fichier {filepath}: {err}")
-            return None
\ No newline at end of file
+            global_logger.error("❌ Erreur lors du téléchargement du fichier %s: %s", filepath, err)
+            return None
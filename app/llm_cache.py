@@ -0,0 +1,72 @@
+# app/llm_cache.py
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from app.db_handler import DbHandler
+from app.logger import global_logger
+from flask_service_tools import AIGatewayClient
+
+class LLMCachedClient:
+    """
+    Enveloppe un AIGatewayClient et met en cache ses réponses, indexées par l'empreinte du prompt.
+    Un prompt identique (même modèle, mêmes messages) ne déclenche qu'un seul appel à l'IA
+    tant que l'entrée n'a pas expiré.
+
+    Les prompts dont le résultat est déjà conservé ailleurs (résumés unitaires, dans summary_cache)
+    passent directement par wrapped_client, pour ne pas être stockés deux fois.
+    """
+    DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30 jours
+
+    def __init__(self, ai_client: AIGatewayClient, db_handler: DbHandler,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS) -> None:
+        """
+        Args:
+            ai_client (AIGatewayClient): Le client IA à envelopper.
+            db_handler (DbHandler): Le gestionnaire de base où sont stockées les réponses.
+            ttl_seconds (int, optional): Durée de validité d'une réponse en cache. Par défaut 30 jours.
+        """
+        self._ai_client = ai_client
+        self._db_handler = db_handler
+        self._ttl_seconds = ttl_seconds
+
+    @property
+    def wrapped_client(self) -> AIGatewayClient:
+        """
+        Le client IA enveloppé, pour un appel qui ne doit ni lire ni alimenter le cache.
+        """
+        return self._ai_client
+
+    @staticmethod
+    def _prompt_hash(model_name: str, messages: List[Dict[str, Any]], options: Dict[str, Any]) -> str:
+        """
+        Calcule l'empreinte d'un prompt. Le modèle et les options d'appel en font partie :
+        deux modèles (ou deux températures) ne partagent pas leurs réponses.
+        """
+        payload = json.dumps([model_name, messages, options], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, model_name: str, messages: List[Dict[str, Any]], **kwargs: Any) -> Optional[Dict[str, Any]]:
+        """
+        Retourne la réponse en cache pour ce prompt, ou None : permet à l'appelant de ne réserver
+        un créneau d'appel (concurrence, limites de débit) qu'en l'absence de réponse en cache.
+        """
+        prompt_hash = self._prompt_hash(model_name, messages, kwargs)
+        cached_response = self._db_handler.get_cached_llm_response(prompt_hash, self._ttl_seconds)
+        if cached_response is not None:
+            global_logger.debug("  LLM ♻️ Réponse trouvée dans le cache (prompt %s).", prompt_hash[:12])
+        return cached_response
+
+    def chat_predict(self, model_name: str, messages: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        """
+        Même interface que AIGatewayClient.chat_predict, avec lecture et alimentation du cache.
+        """
+        cached_response = self.lookup(model_name, messages, **kwargs)
+        if cached_response is not None:
+            return cached_response
+
+        prompt_hash = self._prompt_hash(model_name, messages, kwargs)
+        response = self._ai_client.chat_predict(model_name, messages=messages, **kwargs)
+        # Seules les réponses exploitables sont conservées.
+        if isinstance(response, dict) and response.get('response'):
+            self._db_handler.save_cached_llm_response(prompt_hash, response)
+        return response
@@ -0,0 +1,33 @@
+# app/lru_cache.py
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+
+class LRUCache:
+    """
+    Cache mémoire borné : au-delà de max_size entrées, la moins récemment utilisée est évincée.
+    Partagé entre les threads du pool, d'où le verrou.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Any) -> Tuple[bool, Any]:
+        """
+        Retourne (True, valeur) si la clé est en cache, (False, None) sinon.
+        La valeur en cache peut elle-même valoir None (échec mémorisé).
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, self._entries[key]
+
+    def store(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
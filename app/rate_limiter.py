@@ -0,0 +1,79 @@
+# app/rate_limiter.py
+import threading
+import time
+from typing import Optional
+from app.logger import global_logger
+
+class TokenBucket:
+    """
+    Seau à jetons partagé entre threads : la capacité se recharge en continu à débit constant.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        """
+        Args:
+            capacity (float): Nombre maximal de jetons disponibles d'un coup (rafale).
+            refill_per_second (float): Jetons ajoutés par seconde.
+        """
+        self._capacity = capacity
+        self._refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Bloque jusqu'à ce que `amount` jetons soient disponibles, puis les consomme.
+        Une demande supérieure à la capacité est ramenée à la capacité (sinon elle ne passerait jamais).
+
+        Returns:
+            float: Le temps d'attente total, en secondes.
+        """
+        amount = min(amount, self._capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity,
+                                   self._tokens + (now - self._updated_at) * self._refill_per_second)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self._refill_per_second
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMRateLimiter:
+    """
+    Limite le débit des appels à l'IA en requêtes par minute (RPM) et en tokens par minute (TPM).
+    Une limite à 0 est désactivée.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self._request_bucket: Optional[TokenBucket] = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute > 0 else None
+        )
+        self._token_bucket: Optional[TokenBucket] = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute > 0 else None
+        )
+
+    @staticmethod
+    def estimate_tokens(prompt: str) -> int:
+        """
+        Estimation grossière du nombre de tokens d'un prompt (~4 caractères par token).
+        """
+        return len(prompt) // 4 + 1
+
+    def acquire(self, prompt: str) -> None:
+        """
+        Bloque jusqu'à ce que l'envoi du prompt respecte les deux limites.
+        """
+        waited = 0.0
+        if self._request_bucket is not None:
+            waited += self._request_bucket.acquire(1)
+        if self._token_bucket is not None:
+            waited += self._token_bucket.acquire(self.estimate_tokens(prompt))
+        if waited:
+            global_logger.debug("  LLM ⏳ Limite de débit atteinte, attente de %.1f s.", waited)
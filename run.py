@@ -1,6 +1,8 @@
 import argparse
-import traceback
-from typing import Tuple, Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+import requests
 
 # Import des classes de l'application
 from app.db_handler import DbHandler
@@ -8,37 +10,69 @@ from app.github import GitHubService
 from app.changelog_parser import ChangelogParser
 from app.changelog_writer import ChangelogWriter
 from app.changelog_processor import ChangelogProcessor
+from app.llm_cache import LLMCachedClient
 from app.logger import global_logger
 
 # Import des outils de service
 from flask_service_tools import Config, AIGatewayClient
 
+# Emplacement du ChangeLog de Dolibarr sur GitHub.
+_CHANGELOG_LOCATION = {'owner': 'Dolibarr', 'repo': 'dolibarr', 'branch': 'develop', 'filepath': 'ChangeLog'}
+
+
+def _version_argument(value: str) -> str:
+    """Valide un numéro de version passé en argument, avant tout appel réseau ou accès à la base."""
+    if not ChangelogParser.is_valid_version_prefix(value):
+        raise argparse.ArgumentTypeError(f"version invalide : '{value}' (chiffres et points uniquement, ex: 19 ou 19.0)")
+    return value
 
-def parse_arguments() -> Tuple[str, str]:
-    """Analyse les arguments de la ligne de commande."""
+
+def parse_arguments() -> argparse.Namespace:
+    """Analyse les arguments de la ligne de commande (versions, token, limit, resume)."""
     parser = argparse.ArgumentParser(description='Traiter le changelog de Dolibarr')
-    parser.add_argument('--version', '-v', type=str, required=True,
-                        help='Numéro de version de Dolibarr (ex: 19 ou 19.0)')
+    parser.add_argument('--version', '--versions', '-v', dest='versions', type=_version_argument, nargs='+', required=True,
+                        help='Numéro(s) de version de Dolibarr, traités dans l\'ordre (ex: 19 ou 19.0, ou 19 20 21)')
     parser.add_argument('--token', '-t', type=str, required=True,
                         help='Token d\'accès GitHub')
-    args = parser.parse_args()
-    return args.version, args.token
+    parser.add_argument('--limit', '-l', type=int, default=1000,
+                        help='Nombre maximal de lignes enrichies par version lors de cette exécution (défaut : 1000)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Reprendre l\'enrichissement des lignes restantes (interrompu par --limit ou par le quota '
+                             'GitHub) sans retélécharger le ChangeLog ni réinsérer ses lignes')
+    return parser.parse_args()
 
 
-def initialize_services(github_token: str, dolibarr_version: str) -> Dict[str, Any]:
-    """Initialise et retourne tous les services et gestionnaires nécessaires."""
-    global_logger.info("🔧 Initialisation des services...")
+def initialize_shared_services(github_token: str) -> Dict[str, Any]:
+    """
+    Initialise les services communs à toutes les versions traitées : une seule session GitHub
+    (authentification et connexions réutilisées), un seul parser et un seul writer.
+    """
+    global_logger.info("🔧 Initialisation des services partagés...")
     github_service = GitHubService(github_token)
-    changelog_parser = ChangelogParser()
-    changelog_writer = ChangelogWriter()
+    # Le quota restant est connu dès le départ : la concurrence est réduite s'il ne suffit pas.
+    github_service.tune_concurrency_to_rate_limit()
+    return {
+        "github_service": github_service,
+        "parser": ChangelogParser(),
+        "writer": ChangelogWriter(),
+    }
+
+
+def initialize_services(shared_services: Dict[str, Any], dolibarr_version: str) -> Dict[str, Any]:
+    """Initialise et retourne tous les services et gestionnaires nécessaires pour une version."""
+    global_logger.info("🔧 Initialisation des services...")
+    github_service = shared_services["github_service"]
+    changelog_parser = shared_services["parser"]
     db_handler = DbHandler(dolibarr_version)
-    ai_client = AIGatewayClient(Config.AI_GATEWAY_URL, global_logger)
+    # Les réponses GitHub sont conservées en base : une relance ne fait que les revalider (HTTP 304).
+    github_service.set_response_store(db_handler)
+    # Les réponses de l'IA aux prompts groupés et thématiques sont mises en cache par prompt : une relance
+    # ne repaie pas les appels déjà faits (les résumés unitaires le sont par ligne, dans summary_cache).
+    ai_client = LLMCachedClient(AIGatewayClient(Config.AI_GATEWAY_URL, global_logger), db_handler)
     processor = ChangelogProcessor(db_handler, github_service, ai_client, changelog_parser)
 
     services = {
-        "github_service": github_service,
-        "parser": changelog_parser,
-        "writer": changelog_writer,
+        **shared_services,
         "db_handler": db_handler,
         "processor": processor,
     }
@@ -46,111 +80,200 @@ def initialize_services(github_token: str, dolibarr_version: str) -> Dict[str, A
     return services
 
 
+def download_changelog_content(github_service: GitHubService) -> Optional[str]:
+    """Télécharge le ChangeLog complet, pour en extraire plusieurs sections sans le retélécharger."""
+    global_logger.info("\n📥 Étape 1: Téléchargement du ChangeLog Dolibarr...")
+    changelog_content = github_service.fetch_raw_file_content(**_CHANGELOG_LOCATION)
+    if not changelog_content:
+        global_logger.error("  ❌ Téléchargement du fichier ChangeLog échoué.")
+        return None
+    global_logger.info("  ✅ ChangeLog téléchargé.")
+    return changelog_content
+
+
 def fetch_and_prepare_changelog_section(
         github_service: GitHubService,
         parser: ChangelogParser,
         writer: ChangelogWriter,
-        version: str
-) -> Optional[List[str]]:
-    """Télécharge, extrait et sauvegarde la section cible du changelog."""
-    global_logger.info(f"\n📥 Étape 1: Téléchargement du ChangeLog Dolibarr...")
-    changelog_content = github_service.fetch_raw_file_content(
-        owner='Dolibarr',
-        repo='dolibarr',
-        branch='develop',
-        filepath='ChangeLog'
-    )
+        version: str,
+        changelog_content: Optional[str] = None
+) -> Optional[str]:
+    """
+    Télécharge, extrait et sauvegarde la section cible du changelog, puis retourne son texte brut.
+    Si changelog_content est fourni (ChangeLog déjà téléchargé), la section y est extraite directement.
+    """
+    if changelog_content is not None:
+        changelog_lines = None
+    else:
+        global_logger.info("\n📥 Étape 1: Téléchargement du ChangeLog Dolibarr...")
+        # Lecture en flux : le téléchargement s'arrête dès que la section recherchée est complète
+        # (un ChangeLog inchangé depuis sa dernière conservation en base est relu depuis celle-ci).
+        changelog_lines = github_service.stream_raw_file_lines(**_CHANGELOG_LOCATION)
 
-    if not changelog_content:
-        global_logger.error("  ❌ Téléchargement du fichier ChangeLog échoué.")
-        return None
-    global_logger.info("  ✅ ChangeLog téléchargé.")
+        if changelog_lines is None:
+            global_logger.error("  ❌ Téléchargement du fichier ChangeLog échoué.")
+            return None
+        global_logger.info("  ✅ Téléchargement du ChangeLog démarré.")
 
-    global_logger.info(f"\n🔎 Étape 2: Extraction de la section pour la v{version}...")
-    section_lines = parser.extract_version_section(changelog_content, version)
+    global_logger.info("\n🔎 Étape 2: Extraction de la section pour la v%s...", version)
+    if changelog_lines is None:
+        section_text = parser.extract_version_section_text(changelog_content, version)
+    else:
+        try:
+            section_text = parser.extract_version_section_text(changelog_lines, version)
+        except requests.exceptions.RequestException:
+            # Section potentiellement tronquée : rien n'est inséré plutôt qu'une version incomplète.
+            global_logger.error("  ❌ Section de la v%s non extraite : ChangeLog reçu incomplet.", version)
+            return None
+        finally:
+            changelog_lines.close()  # Interrompt le téléchargement du reste du fichier
+    section_lines = section_text.splitlines()
 
     if not section_lines:
-        global_logger.warning(f"  ℹ️ Section pour la v{version} non trouvée dans le ChangeLog ou vide.")
+        global_logger.warning("  ℹ️ Section pour la v%s non trouvée dans le ChangeLog ou vide.", version)
         return None
 
-    global_logger.info(f"  ✅ Section v{version} extraite ({len(section_lines)} lignes).")
-    try:
-        writer.save_lines_to_file(section_lines, version)
-        global_logger.info(f"  📄 Section sauvegardée localement dans 'data/changelog_v{version}.txt'.")
-    except IOError as e:
-        global_logger.error(f"  ⚠️ Erreur lors de la sauvegarde locale de la section : {e}")
+    global_logger.info("  ✅ Section v%s extraite (%s lignes).", version, len(section_lines))
+    # Sauvegarde locale différée : le traitement en base commence sans attendre l'écriture du fichier.
+    writer.save_lines_to_file_in_background(section_lines, version)
+    global_logger.info("  📄 Sauvegarde locale de la section dans 'data/changelog_v%s.txt' lancée.", version)
 
-    return section_lines
+    return section_text
 
 
 def process_changelog_database(
         processor: ChangelogProcessor,
         db_handler: DbHandler,
-        section_lines: List[str],
-        writer: ChangelogWriter
+        section_text: Optional[str],
+        writer: ChangelogWriter,
+        process_limit: int = 1000
 ) -> None:
-    """Traite la base de données : création, insertion, et enrichissement."""
-    global_logger.info(f"\n🗃️ Étape 3: Traitement de la base de données...")
-
-    global_logger.info("  [Phase 1 BD] Préparation table et insertion initiale...")
-    db_handler.create_changelog_table()
+    """
+    Traite la base de données (table déjà créée) : insertion, et enrichissement d'au plus process_limit lignes.
+    Sans section_text (reprise), seules les lignes restant à traiter sont enrichies.
+    """
+    global_logger.info("\n🗃️ Étape 3: Traitement de la base de données...")
 
-    if hasattr(processor, 'determine_line_type_and_process_db'):
-        processor.determine_line_type_and_process_db(section_lines)
-    else:
-        global_logger.warning(
-            "  ⚠️ 'determine_line_type_and_process_db' non trouvée sur le processor. "
-            "L'insertion initiale peut être incomplète.\n"
-            "     Veuillez implémenter cette logique ou une alternative pour peupler la base de données."
+    if section_text is None:
+        global_logger.info("  [Phase 1 BD] Ignorée : reprise des lignes déjà insérées.")
+    elif not processor.has_determine_line_type:
+        global_logger.error(
+            "  ❌ 'determine_line_type_and_process_db' non trouvée sur le processor : "
+            "la base de données ne peut pas être peuplée, traitement de la version interrompu."
         )
+        return
+    else:
+        global_logger.info("  [Phase 1 BD] Insertion initiale (table préparée pendant le téléchargement)...")
+        # Chargement initial sans journal ni fsync : en cas d'interruption, il suffit de relancer le script.
+        with db_handler.bulk_load():
+            processor.determine_line_type_and_process_db(section_text=section_text)
+        # Statistiques à jour pour le planificateur, une fois la table peuplée.
+        db_handler.analyze()
 
     global_logger.info("\n  [Phase 2 BD] Enrichissement des données via l'API GitHub et l'IA...")
-    concatenated_prompts = processor.process_changelog_lines_refactored()
+    concatenated_prompts = processor.process_changelog_lines_refactored(process_limit=process_limit)
 
     if concatenated_prompts:
         try:
             writer.save_text_block(concatenated_prompts, 'data/prompts_summary.txt')
             global_logger.info("  📄 Prompts et résumés sauvegardés dans 'data/prompts_summary.txt'.")
-            if hasattr(processor, 'summarize_by_theme'):
+            if processor.has_summarize_by_theme:
                 processor.summarize_by_theme(concatenated_prompts, writer)
             else:
                 global_logger.warning(
                     "  ⚠️ 'summarize_by_theme' non trouvée sur le processor. Le changelog final ne sera pas généré.")
         except IOError as e:
-            global_logger.error(f"  ⚠️ Erreur lors de la sauvegarde des prompts : {e}")
+            global_logger.error("  ⚠️ Erreur lors de la sauvegarde des prompts : %s", e)
     else:
         global_logger.info("  ℹ️ Aucun prompt n'a été généré ou retourné par le processeur.")
 
     global_logger.info("\n✅ Traitement de la base de données terminé.")
 
 
-def main() -> None:
-    """Fonction principale orchestrant le traitement du changelog."""
+def process_version(shared_services: Dict[str, Any], dolibarr_version: str,
+                    changelog_content: Optional[str] = None, process_limit: int = 1000,
+                    resume: bool = False) -> None:
+    """
+    Traite le changelog d'une version : téléchargement (sauf si changelog_content est fourni),
+    extraction, puis base de données. En reprise (resume), seules les lignes déjà insérées
+    et restant à traiter sont enrichies.
+    """
+    services: Optional[Dict[str, Any]] = None
     try:
-        current_dolibarr_version, current_github_token = parse_arguments()
-        global_logger.info(f"🚀 Démarrage du traitement du changelog pour Dolibarr v{current_dolibarr_version}")
+        global_logger.info("🚀 Démarrage du traitement du changelog pour Dolibarr v%s", dolibarr_version)
 
-        services = initialize_services(current_github_token, current_dolibarr_version)
+        services = initialize_services(shared_services, dolibarr_version)
 
-        section_lines = fetch_and_prepare_changelog_section(
-            services["github_service"], services["parser"], services["writer"], current_dolibarr_version
-        )
+        if resume:
+            services["db_handler"].create_changelog_table()
+            process_changelog_database(
+                services["processor"], services["db_handler"], None, services["writer"], process_limit
+            )
+            global_logger.info("\n🎉 Reprise du traitement du changelog terminée avec succès!")
+            return
+
+        # La table (disque) est préparée pendant le téléchargement et l'extraction du ChangeLog (réseau).
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            table_ready = executor.submit(services["db_handler"].create_changelog_table)
+            section_text = fetch_and_prepare_changelog_section(
+                services["github_service"], services["parser"], services["writer"], dolibarr_version,
+                changelog_content
+            )
+            table_ready.result()
 
-        if not section_lines:
+        if not section_text:
             global_logger.warning("ℹ️ Arrêt du traitement car la section du changelog n'a pas pu être obtenue.")
             return
 
         process_changelog_database(
-            services["processor"], services["db_handler"], section_lines, services["writer"]
+            services["processor"], services["db_handler"], section_text, services["writer"], process_limit
         )
 
         global_logger.info("\n🎉 Traitement du changelog terminé avec succès!")
 
     except Exception as e:
-        # Remplacement de .critical et .exception par .error, comme demandé.
-        global_logger.error(f"❌ Erreur majeure durant le traitement global : {e}")
-        global_logger.error(f"Traceback de l'erreur :\n{traceback.format_exc()}")
+        # Remplacement de .critical et .exception par .error, comme demandé : la trace est jointe
+        # par exc_info, et n'est mise en forme que si le message est effectivement émis.
+        global_logger.error("❌ Erreur majeure durant le traitement global : %s", e, exc_info=True)
         global_logger.info("ℹ️ Le traitement a été interrompu en raison d'une erreur.")
+    finally:
+        if services:
+            services["github_service"].set_response_store(None)
+            services["db_handler"].close()
+
+
+def main() -> None:
+    """Fonction principale orchestrant le traitement du changelog, version par version."""
+    args = parse_arguments()
+    dolibarr_versions = args.versions
+    try:
+        shared_services = initialize_shared_services(args.token)
+        # Une seule version : le ChangeLog est lu en flux, jusqu'à la fin de sa section.
+        # Plusieurs versions : il est téléchargé une fois en entier, puis chaque section y est extraite.
+        changelog_content = None
+        # En reprise, le ChangeLog n'est pas nécessaire : les lignes sont déjà en base.
+        if len(dolibarr_versions) > 1 and not args.resume:
+            github_service = shared_services["github_service"]
+            # La base (tables partagées entre versions) conserve le ChangeLog et son ETag d'une exécution à l'autre.
+            with DbHandler(dolibarr_versions[0]) as db_handler:
+                github_service.set_response_store(db_handler)
+                try:
+                    changelog_content = download_changelog_content(github_service)
+                finally:
+                    github_service.set_response_store(None)
+            if changelog_content is None:
+                global_logger.warning("ℹ️ Arrêt du traitement car le ChangeLog n'a pas pu être obtenu.")
+                return
+    except Exception as e:
+        global_logger.error("❌ Erreur majeure durant l'initialisation : %s", e, exc_info=True)
+        return
+
+    for dolibarr_version in dolibarr_versions:
+        # Une erreur sur une version est journalisée sans empêcher le traitement des suivantes.
+        process_version(shared_services, dolibarr_version, changelog_content, args.limit, args.resume)
+
+    if not shared_services["writer"].wait_for_pending_writes():
+        global_logger.error("  ⚠️ Au moins une sauvegarde locale de section a échoué.")
 
 
 if __name__ == "__main__":